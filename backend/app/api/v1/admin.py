@@ -3,85 +3,194 @@ Admin API - User management endpoints
 Requires admin authentication
 """
 
-from fastapi import APIRouter, HTTPException, Header, Depends
+from fastapi import APIRouter, HTTPException, Header, Depends, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional, List
+from functools import lru_cache
+from cachetools import TTLCache
+import hashlib
+import hmac
+import logging
 import os
-import httpx
+import threading
+import time
 
 from app.database import (
     get_all_users,
     update_user,
     delete_user_from_db,
-    get_user_latest_plan
+    user_exists,
+    get_user_latest_plan,
+    get_users_version
 )
-from app.services.admin_auth import verify_token, get_admin_by_username
+from app.services.admin_auth import verify_admin_token, get_admin_count
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 security = HTTPBearer(auto_error=False)
+logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=1)
 def get_admin_clerk_user_id() -> str:
-    """Get admin Clerk User ID from environment (read dynamically)"""
+    """
+    Get admin Clerk User ID from environment
+    
+    Read once on first use (after .env has been loaded) and cached;
+    call reload_admin_clerk_user_id() to pick up a changed value.
+    """
     return os.getenv("ADMIN_CLERK_USER_ID", "")
 
 
-def verify_admin(credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)) -> dict:
+def reload_admin_clerk_user_id() -> str:
+    """Drop the cached admin Clerk User ID and re-read it from environment"""
+    get_admin_clerk_user_id.cache_clear()
+    with _principal_cache_lock:
+        _principal_cache.clear()
+    return get_admin_clerk_user_id()
+
+
+# Resolved admin principals keyed by SHA-256 of the bearer token
+# Entries never outlive PRINCIPAL_CACHE_TTL_SECONDS or the JWT's own expiry
+PRINCIPAL_CACHE_TTL_SECONDS = 60
+_principal_cache = TTLCache(maxsize=4096, ttl=PRINCIPAL_CACHE_TTL_SECONDS)
+_principal_cache_lock = threading.Lock()
+
+
+def _resolve_principal(token: str) -> Optional[dict]:
     """
-    Verify admin access - supports both Clerk User ID and JWT token authentication
+    Resolve a bearer token to an admin principal, or None if it isn't one
+    
+    Tries the Clerk User ID path first, then JWT. Successful lookups are cached,
+    so repeat requests with the same token are a single dict lookup.
     """
-    if not credentials:
-        raise HTTPException(status_code=401, detail="Authorization header required")
+    key = hashlib.sha256(token.encode('utf-8')).digest()
+    now = time.time()
     
-    token = credentials.credentials
+    with _principal_cache_lock:
+        cached = _principal_cache.get(key)
+    if cached is not None:
+        principal, expires_at = cached
+        if expires_at > now:
+            return principal
+        with _principal_cache_lock:
+            _principal_cache.pop(key, None)
     
-    # First, try to verify as JWT token (username/password admin)
-    payload = verify_token(token)
-    if payload:
-        username = payload.get("sub")
-        if username:
-            admin = get_admin_by_username(username)
-            if admin:
-                return {"type": "jwt", "username": username, **admin}
+    principal = None
+    expires_at = now + PRINCIPAL_CACHE_TTL_SECONDS
     
-    # If not JWT, check if it's a Clerk User ID
-    # Clerk User IDs start with "user_"
+    # Clerk User IDs start with "user_" and can never be JWTs, so check them
+    # first and skip the token decode entirely
     if token.startswith("user_"):
-        # Check if this Clerk User ID is the admin (read dynamically)
         admin_clerk_id = get_admin_clerk_user_id()
-        if admin_clerk_id and token == admin_clerk_id:
-            return {
+        # Constant-time comparison to avoid leaking the admin ID via timing
+        if admin_clerk_id and hmac.compare_digest(token.encode('utf-8'), admin_clerk_id.encode('utf-8')):
+            principal = {
                 "type": "clerk",
                 "clerk_user_id": token,
                 "username": "clerk_admin"
             }
-        else:
-            raise HTTPException(
-                status_code=403,
-                detail="Access denied. Admin privileges required."
-            )
+    else:
+        # Otherwise, verify as JWT token (username/password admin)
+        verified = verify_admin_token(token)
+        if verified:
+            username = verified["payload"].get("sub")
+            admin = verified["admin"]
+            if username and admin:
+                principal = {"type": "jwt", "username": username, **admin}
+                expires_at = min(expires_at, verified["exp"])
+    
+    # Failed lookups are not cached so invalid tokens can't flood the cache
+    if principal is not None:
+        with _principal_cache_lock:
+            _principal_cache[key] = (principal, expires_at)
+    return principal
+
+
+def verify_admin(credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)) -> dict:
+    """
+    Verify admin access - supports both Clerk User ID and JWT token authentication
+    """
+    if not credentials:
+        raise HTTPException(status_code=401, detail="Authorization header required")
+    
+    token = credentials.credentials
+    principal = _resolve_principal(token)
+    if principal is not None:
+        return principal
+    
+    # A Clerk user who isn't the admin is authenticated but not authorized
+    if token.startswith("user_"):
+        raise HTTPException(
+            status_code=403,
+            detail="Access denied. Admin privileges required."
+        )
     
     # If neither JWT nor valid Clerk ID, deny access
     raise HTTPException(status_code=401, detail="Invalid or expired token")
 
 
+# Shared settings for request bodies: immutable, no unknown fields, bounded strings
+REQUEST_MODEL_CONFIG = ConfigDict(
+    frozen=True,
+    extra="forbid",
+    populate_by_name=True,
+    str_strip_whitespace=True,
+    str_max_length=4096
+)
+
+
 class UpdateUserRequest(BaseModel):
+    model_config = REQUEST_MODEL_CONFIG
+    
     clerk_user_id: str
     email: Optional[str] = None
     name: Optional[str] = None
 
 
 class DeleteUserRequest(BaseModel):
+    model_config = REQUEST_MODEL_CONFIG
+    
     clerk_user_id: str
 
 
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Check If-None-Match against a weak ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    # Weak comparison: W/"v" and "v" are equivalent
+    return "*" in candidates or etag in candidates or etag[2:] in candidates
+
+
+async def _users_etag() -> str:
+    """Weak ETag derived from the users data version"""
+    version = await run_in_threadpool(get_users_version)
+    return f'W/"{version}"'
+
+
 @router.get("/users")
-async def list_all_users(current_admin: dict = Depends(verify_admin)):
+async def list_all_users(
+    request: Request,
+    response: Response,
+    current_admin: dict = Depends(verify_admin)
+):
     """Get all users in the system (admin only)"""
     
     try:
-        users = get_all_users()
+        # Short-circuit polling: nothing changed since the client's copy
+        etag = await _users_etag()
+        if _etag_matches(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "private, no-cache"
+        
+        # Latest classification and plan are joined in, so no per-user follow-up calls are needed.
+        # Sync SQLite helpers run in the threadpool so they don't block the event loop.
+        users = await run_in_threadpool(get_all_users)
         return {
             "success": True,
             "count": len(users),
@@ -92,12 +201,23 @@ async def list_all_users(current_admin: dict = Depends(verify_admin)):
 
 
 @router.get("/users/{clerk_user_id}")
-async def get_user_details(clerk_user_id: str, current_admin: dict = Depends(verify_admin)):
+async def get_user_details(
+    clerk_user_id: str,
+    request: Request,
+    response: Response,
+    current_admin: dict = Depends(verify_admin)
+):
     """Get detailed information about a specific user (admin only)"""
     
     try:
+        etag = await _users_etag()
+        if _etag_matches(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "private, no-cache"
+        
         # Get user's latest plan which includes all info
-        plan = get_user_latest_plan(clerk_user_id)
+        plan = await run_in_threadpool(get_user_latest_plan, clerk_user_id)
         
         if not plan:
             raise HTTPException(status_code=404, detail="User not found")
@@ -131,7 +251,8 @@ async def update_user_info(
         raise HTTPException(status_code=400, detail="User ID mismatch")
     
     try:
-        updated = update_user(
+        updated = await run_in_threadpool(
+            update_user,
             clerk_user_id=clerk_user_id,
             email=request.email,
             name=request.name
@@ -152,45 +273,53 @@ async def update_user_info(
 
 
 @router.delete("/users/{clerk_user_id}")
-async def delete_user(clerk_user_id: str, current_admin: dict = Depends(verify_admin)):
+async def delete_user(
+    clerk_user_id: str,
+    request: Request,
+    current_admin: dict = Depends(verify_admin)
+):
     """Delete user from database and Clerk (admin only)"""
     
     try:
-        # 1. Delete from database
-        deleted_from_db = delete_user_from_db(clerk_user_id)
+        clerk_secret_key = os.getenv("CLERK_SECRET_KEY")
+        
+        # Unknown users are rejected up front (the existence check is cached)
+        if not await run_in_threadpool(user_exists, clerk_user_id):
+            raise HTTPException(status_code=404, detail="User not found in database")
         
+        # 1. Database deletion must succeed before the Clerk account is touched,
+        # so a 404/500 response never leaves a user deleted from Clerk only
+        deleted_from_db = await run_in_threadpool(delete_user_from_db, clerk_user_id)
         if not deleted_from_db:
             raise HTTPException(status_code=404, detail="User not found in database")
         
-        # 2. Delete from Clerk
-        clerk_secret_key = os.getenv("CLERK_SECRET_KEY")
+        # 2. Clerk deletion may fail without failing the request
         if not clerk_secret_key:
-            print("⚠️ WARNING: CLERK_SECRET_KEY not set. User deleted from database but not from Clerk.")
+            logger.warning("⚠️ CLERK_SECRET_KEY not set. User deleted from database but not from Clerk.")
             return {
                 "success": True,
                 "message": "User deleted from database. Clerk deletion skipped (no API key).",
                 "clerk_user_id": clerk_user_id
             }
         
-        # Call Clerk API to delete user
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.delete(
-                    f"https://api.clerk.com/v1/users/{clerk_user_id}",
-                    headers={
-                        "Authorization": f"Bearer {clerk_secret_key}",
-                        "Content-Type": "application/json"
-                    },
-                    timeout=10.0
-                )
-                
-                if response.status_code == 200 or response.status_code == 404:
-                    print(f"✅ User deleted from Clerk: {clerk_user_id}")
-                else:
-                    print(f"⚠️ Clerk deletion returned status {response.status_code}: {response.text}")
-        except Exception as clerk_error:
-            print(f"⚠️ Error deleting from Clerk: {str(clerk_error)}")
+            # Reuse the shared client created in the app lifespan (keep-alive pool)
+            clerk_result = await request.app.state.http.delete(
+                f"https://api.clerk.com/v1/users/{clerk_user_id}",
+                headers={
+                    "Authorization": f"Bearer {clerk_secret_key}",
+                    "Content-Type": "application/json"
+                },
+                timeout=10.0
+            )
+        except Exception as e:
+            logger.warning("⚠️ Error deleting from Clerk: %s", e)
             # Continue even if Clerk deletion fails - database deletion succeeded
+        else:
+            if clerk_result.status_code == 200 or clerk_result.status_code == 404:
+                logger.info("✅ User deleted from Clerk: %s", clerk_user_id)
+            else:
+                logger.warning("⚠️ Clerk deletion returned status %s: %s", clerk_result.status_code, clerk_result.text)
         
         return {
             "success": True,
@@ -213,7 +342,8 @@ async def check_admin_status(credentials: Optional[HTTPAuthorizationCredentials]
         }
     
     try:
-        admin = verify_admin(credentials)
+        # A principal cache miss decodes the JWT and queries the admin row; keep it off the event loop
+        admin = await run_in_threadpool(verify_admin, credentials)
         return {
             "is_admin": True,
             "username": admin.get("username", "admin"),
@@ -229,12 +359,7 @@ async def check_admin_status(credentials: Optional[HTTPAuthorizationCredentials]
 @router.get("/health")
 async def admin_health():
     """Health check for admin API"""
-    from app.database import get_db_connection
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) as count FROM admin_users")
-    admin_count = cursor.fetchone()['count']
-    conn.close()
+    admin_count = get_admin_count()
     
     clerk_secret_key = os.getenv("CLERK_SECRET_KEY", "")
     
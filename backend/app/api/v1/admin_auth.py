@@ -4,6 +4,8 @@ Endpoints for admin login and account management
 """
 
 from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from typing import Optional
@@ -11,13 +13,18 @@ from datetime import timedelta
 from app.services.admin_auth import (
     authenticate_admin,
     create_access_token,
-    verify_token,
+    # Aliased: the /verify route handler below is also named verify_admin_token
+    verify_admin_token as _verify_admin_token,
     create_admin_user,
-    get_admin_by_username
+    SQL_COUNT_ADMINS
 )
 from app.database import get_db_connection
 
-router = APIRouter(prefix="/admin-auth", tags=["Admin Authentication"])
+router = APIRouter(
+    prefix="/admin-auth",
+    tags=["Admin Authentication"],
+    default_response_class=ORJSONResponse
+)
 security = HTTPBearer()
 
 
@@ -40,16 +47,16 @@ class LoginResponse(BaseModel):
 def get_current_admin(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     """Get current admin from JWT token"""
     token = credentials.credentials
-    payload = verify_token(token)
+    verified = _verify_admin_token(token)
     
-    if payload is None:
+    if verified is None:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
     
-    username = payload.get("sub")
+    username = verified["payload"].get("sub")
     if username is None:
         raise HTTPException(status_code=401, detail="Invalid token payload")
     
-    admin = get_admin_by_username(username)
+    admin = verified["admin"]
     if admin is None:
         raise HTTPException(status_code=401, detail="Admin user not found")
     
@@ -59,7 +66,8 @@ def get_current_admin(credentials: HTTPAuthorizationCredentials = Depends(securi
 @router.post("/login", response_model=LoginResponse)
 async def admin_login(request: LoginRequest):
     """Login as admin with username and password"""
-    admin = authenticate_admin(request.username, request.password)
+    # Password verification (argon2id, or bcrypt plus a re-hash) is CPU-bound; keep it off the event loop
+    admin = await run_in_threadpool(authenticate_admin, request.username, request.password)
     
     if not admin:
         raise HTTPException(
@@ -81,15 +89,17 @@ async def admin_login(request: LoginRequest):
     )
 
 
+def _count_admins() -> int:
+    """Current number of admin accounts (uncached, unlike get_admin_count)"""
+    with get_db_connection() as conn:
+        return conn.execute(SQL_COUNT_ADMINS).fetchone()['count']
+
+
 @router.post("/create-admin")
 async def create_admin_account(request: CreateAdminRequest):
     """Create a new admin account (requires existing admin or first-time setup)"""
-    # Check if any admin exists
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) as count FROM admin_users")
-    admin_count = cursor.fetchone()['count']
-    conn.close()
+    # Check if any admin exists (pooled SQLite query, run off the event loop)
+    admin_count = await run_in_threadpool(_count_admins)
     
     # Allow creation if no admins exist (first-time setup)
     # Otherwise, require authentication
@@ -99,7 +109,8 @@ async def create_admin_account(request: CreateAdminRequest):
             detail="Admin accounts can only be created by existing admins or during first-time setup"
         )
     
-    success = create_admin_user(request.username, request.password)
+    # Hashes the password (argon2id) and writes the row
+    success = await run_in_threadpool(create_admin_user, request.username, request.password)
     
     if not success:
         raise HTTPException(
@@ -131,7 +142,7 @@ async def get_current_admin_info(current_admin: dict = Depends(get_current_admin
 async def verify_admin_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Verify if the provided token is valid"""
     try:
-        admin = get_current_admin(credentials)
+        admin = await run_in_threadpool(get_current_admin, credentials)
         return {
             "valid": True,
             "username": admin["username"]
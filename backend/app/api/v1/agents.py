@@ -3,57 +3,90 @@ Agent API Routes
 Endpoints for AI agent-based fitness recommendations
 """
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse, StreamingResponse
-from pydantic import BaseModel
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from typing import Literal, Optional
 from pathlib import Path
 from langchain_openai import ChatOpenAI
 from app.services.supervisor_agent import SupervisorAgent
 from app.services.motivational_agent import MotivationalAgent
 import os
 import asyncio
-import json
+import logging
+import orjson
 
 
-router = APIRouter(prefix="/agents", tags=["Agents"])
+router = APIRouter(prefix="/agents", tags=["Agents"], default_response_class=ORJSONResponse)
+logger = logging.getLogger(__name__)
 
-# Initialize supervisor agent
+# Directory for generated markdown plans (created once at startup in main.py)
+RECOMMENDATIONS_DIR = Path("data/recommendations")
+
+def _sse(event: dict) -> bytes:
+    """Encode one Server-Sent Event (bytes, so Starlette skips re-encoding)"""
+    return b"data: " + orjson.dumps(event) + b"\n\n"
+
+
+# Agents are created once at startup (see lifespan in app/main.py) and stored on app.state
 # You'll need to set OPENAI_API_KEY environment variable
-supervisor = None
-motivational_agent = None
 
 
-def get_supervisor():
-    """Get or create supervisor agent"""
-    global supervisor
+def create_supervisor() -> SupervisorAgent:
+    """Create the supervisor agent"""
+    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.7, streaming=True)
+    return SupervisorAgent(llm)
+
+
+def create_motivational_agent() -> MotivationalAgent:
+    """Create the motivational agent"""
+    # Slightly higher temp for creativity; a 100-char sentence is ~25 tokens, so cap generation at 40
+    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.8, max_tokens=40)
+    return MotivationalAgent(llm)
+
+
+def get_supervisor(request: Request) -> SupervisorAgent:
+    """Get the supervisor agent created at startup"""
+    supervisor = getattr(request.app.state, "supervisor", None)
     if supervisor is None:
-        print("🔧 Initializing supervisor agent for the first time...")
-        llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.7)
-        supervisor = SupervisorAgent(llm)
-        print("✅ Supervisor agent initialized successfully")
-    else:
-        print("♻️ Reusing existing supervisor agent instance")
+        # Startup creation failed (e.g. OPENAI_API_KEY was missing), retry now
+        supervisor = create_supervisor()
+        request.app.state.supervisor = supervisor
     return supervisor
 
 
-def get_motivational_agent():
-    """Get or create motivational agent"""
-    global motivational_agent
+def get_motivational_agent(request: Request) -> MotivationalAgent:
+    """Get the motivational agent created at startup"""
+    motivational_agent = getattr(request.app.state, "motivational", None)
     if motivational_agent is None:
-        print("🔧 Initializing motivational agent for the first time...")
-        llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.8)  # Slightly higher temp for creativity
-        motivational_agent = MotivationalAgent(llm)
-        print("✅ Motivational agent initialized successfully")
-    else:
-        print("♻️ Reusing existing motivational agent instance")
+        motivational_agent = create_motivational_agent()
+        request.app.state.motivational = motivational_agent
     return motivational_agent
 
 
+# Shared settings for request bodies: immutable, no unknown fields,
+# and bounded string sizes so oversized input never reaches the LLM
+REQUEST_MODEL_CONFIG = ConfigDict(
+    frozen=True,
+    extra="forbid",
+    populate_by_name=True,
+    str_strip_whitespace=True,
+    str_max_length=4096
+)
+
+
 class RecommendationRequest(BaseModel):
-    body_type: str  # endomorph, ectomorph, mesomorph
+    model_config = REQUEST_MODEL_CONFIG
+    
+    body_type: Literal["endomorph", "ectomorph", "mesomorph"]
     goals: str
-    max_iterations: int = 2
+    max_iterations: int = Field(default=2, ge=1, le=5)  # bounds LLM cost per request
+    
+    @field_validator("body_type", mode="before")
+    @classmethod
+    def normalize_body_type(cls, value):
+        """Accept any casing (e.g. "Mesomorph") before the Literal check"""
+        return value.strip().lower() if isinstance(value, str) else value
 
 
 class RecommendationResponse(BaseModel):
@@ -68,7 +101,7 @@ class RecommendationResponse(BaseModel):
 
 
 @router.post("/recommendations/generate", response_model=RecommendationResponse)
-async def generate_recommendations(request: RecommendationRequest):
+async def generate_recommendations(request: RecommendationRequest, http_request: Request):
     """
     Generate comprehensive fitness recommendations
     
@@ -81,39 +114,30 @@ async def generate_recommendations(request: RecommendationRequest):
         Complete fitness plan with diet and exercise
     """
     try:
-        print(f"🚀 [generate_recommendations] Called with body_type={request.body_type}, goals={request.goals[:50]}...")
-        # Validate body type
-        valid_body_types = ['endomorph', 'ectomorph', 'mesomorph']
-        if request.body_type.lower() not in valid_body_types:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid body_type. Must be one of: {valid_body_types}"
-            )
+        logger.info("🚀 [generate_recommendations] Called with body_type=%s, goals=%.50s...", request.body_type, request.goals)
+        # body_type is validated and lowercased by RecommendationRequest
         
         # Get supervisor
-        print("👤 Getting supervisor agent...")
-        supervisor_agent = get_supervisor()
+        logger.debug("👤 Getting supervisor agent...")
+        supervisor_agent = get_supervisor(http_request)
         
         # Generate recommendations
-        print(f"⚙️ Calling supervisor.generate_recommendations()...")
-        result = supervisor_agent.generate_recommendations(
-            body_type=request.body_type.lower(),
+        logger.debug("⚙️ Calling supervisor.generate_recommendations()...")
+        # Run the blocking LLM pipeline in a worker thread so the event loop stays free
+        result = await asyncio.to_thread(
+            supervisor_agent.generate_recommendations,
+            body_type=request.body_type,
             goals=request.goals,
             max_iterations=request.max_iterations
         )
-        print(f"✅ Supervisor.generate_recommendations() completed successfully")
-        
-        # Create output directory
-        output_dir = Path("data/recommendations")
-        output_dir.mkdir(parents=True, exist_ok=True)
+        logger.info("✅ Supervisor.generate_recommendations() completed successfully")
         
         # Save markdown file
         timestamp = result['generated_at'].replace(':', '-').replace('.', '-')
         filename = f"plan_{request.body_type}_{timestamp}.md"
-        file_path = output_dir / filename
+        file_path = RECOMMENDATIONS_DIR / filename
         
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(result['markdown'])
+        await asyncio.to_thread(file_path.write_text, result['markdown'], encoding='utf-8')
         
         # Return response
         return RecommendationResponse(
@@ -132,7 +156,7 @@ async def generate_recommendations(request: RecommendationRequest):
 
 
 @router.post("/recommendations/stream")
-async def stream_recommendations(request: RecommendationRequest):
+async def stream_recommendations(request: RecommendationRequest, http_request: Request):
     """
     Stream fitness recommendations in real-time
     
@@ -142,48 +166,76 @@ async def stream_recommendations(request: RecommendationRequest):
         max_iterations: Number of refinement iterations (default: 2)
     
     Yields:
-        Server-Sent Events with progress updates
+        Server-Sent Events with progress updates, token deltas
+        (workout_delta / diet_delta) and the full plans
+        (workout_complete / diet_complete)
     """
     async def event_generator():
         try:
-            # Validate body type
-            valid_body_types = ['endomorph', 'ectomorph', 'mesomorph']
-            if request.body_type.lower() not in valid_body_types:
-                yield f"data: {json.dumps({'error': f'Invalid body_type. Must be one of: {valid_body_types}'})}\n\n"
-                return
-            
             # Send initial message
-            yield f"data: {json.dumps({'event': 'start', 'message': 'Starting plan generation...'})}\n\n"
+            yield _sse({'event': 'start', 'message': 'Starting plan generation...'})
             
             # Get supervisor
-            supervisor_agent = get_supervisor()
+            supervisor_agent = get_supervisor(http_request)
             
             # Send status updates
-            yield f"data: {json.dumps({'event': 'status', 'message': f'Creating workout plan for {request.body_type} body type...'})}\n\n"
+            yield _sse({'event': 'status', 'message': f'Creating workout plan for {request.body_type} body type...'})
             
             # Generate exercise plan
             exercise_state = {
-                'body_type': request.body_type.lower(),
+                'body_type': request.body_type,
                 'goals': request.goals,
                 'current_iteration': 0,
                 'max_iterations': request.max_iterations
             }
             
-            yield f"data: {json.dumps({'event': 'status', 'message': 'Generating exercise recommendations...'})}\n\n"
+            yield _sse({'event': 'status', 'message': 'Generating exercise recommendations...'})
+            yield _sse({'event': 'status', 'message': 'Generating diet recommendations...'})
             
-            exercise_rec = supervisor_agent.exercise_agent.generate_recommendation(exercise_state)
+            # Exercise and diet plans are independent, so stream both agents concurrently
+            # and forward their token deltas as they arrive
+            events: asyncio.Queue = asyncio.Queue()
             
-            yield f"data: {json.dumps({'event': 'workout_complete', 'content': exercise_rec})}\n\n"
-            yield f"data: {json.dumps({'event': 'status', 'message': 'Generating diet recommendations...'})}\n\n"
+            async def stream_agent(agent, name: str, fallback: str):
+                """Push one agent's deltas, then its full text, onto the shared queue"""
+                try:
+                    parts = []
+                    async for delta in agent.astream_recommendation(exercise_state):
+                        parts.append(delta)
+                        await events.put({'event': f'{name}_delta', 'content': delta})
+                    await events.put({'event': f'{name}_complete', 'content': ''.join(parts) or fallback})
+                except Exception as e:
+                    await events.put(e)
             
-            # Generate diet plan
-            diet_rec = supervisor_agent.diet_agent.generate_recommendation(exercise_state)
+            tasks = [
+                asyncio.create_task(stream_agent(
+                    supervisor_agent.exercise_agent, 'workout',
+                    "Exercise recommendation could not be generated."
+                )),
+                asyncio.create_task(stream_agent(
+                    supervisor_agent.diet_agent, 'diet',
+                    "Diet recommendation could not be generated."
+                )),
+            ]
             
-            yield f"data: {json.dumps({'event': 'diet_complete', 'content': diet_rec})}\n\n"
-            yield f"data: {json.dumps({'event': 'complete', 'message': 'Plan generation complete!'})}\n\n"
+            try:
+                completed = 0
+                while completed < len(tasks):
+                    event = await events.get()
+                    if isinstance(event, Exception):
+                        raise event
+                    if event['event'].endswith('_complete'):
+                        completed += 1
+                    yield _sse(event)
+            finally:
+                # Don't leave an agent running if the other failed or the client disconnected
+                for task in tasks:
+                    task.cancel()
+            
+            yield _sse({'event': 'complete', 'message': 'Plan generation complete!'})
             
         except Exception as e:
-            yield f"data: {json.dumps({'event': 'error', 'message': str(e)})}\n\n"
+            yield _sse({'event': 'error', 'message': str(e)})
     
     return StreamingResponse(
         event_generator(),
@@ -197,8 +249,16 @@ async def stream_recommendations(request: RecommendationRequest):
 
 
 class MotivationalRequest(BaseModel):
-    tone: str = "Energetic"  # Stoic, Energetic, Scientific, or Empathetic
+    model_config = REQUEST_MODEL_CONFIG
+    
+    tone: Literal["Stoic", "Energetic", "Scientific", "Empathetic"] = "Energetic"
     day_of_week: Optional[str] = None
+    
+    @field_validator("tone", mode="before")
+    @classmethod
+    def normalize_tone(cls, value):
+        """Accept any casing (e.g. "stoic") before the Literal check"""
+        return value.strip().capitalize() if isinstance(value, str) else value
 
 
 class MotivationalResponse(BaseModel):
@@ -208,7 +268,7 @@ class MotivationalResponse(BaseModel):
 
 
 @router.post("/motivational/generate", response_model=MotivationalResponse)
-async def generate_motivational(request: MotivationalRequest):
+async def generate_motivational(request: MotivationalRequest, http_request: Request):
     """
     Generate a single, punchy, and impactful motivational sentence
     
@@ -220,19 +280,13 @@ async def generate_motivational(request: MotivationalRequest):
         Motivational sentence (max 100 characters)
     """
     try:
-        # Validate tone
-        valid_tones = ["Stoic", "Energetic", "Scientific", "Empathetic"]
-        if request.tone not in valid_tones:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid tone. Must be one of: {valid_tones}"
-            )
-        
         # Get motivational agent
-        agent = get_motivational_agent()
+        agent = get_motivational_agent(http_request)
         
-        # Generate sentence
-        sentence = agent.generate_motivational_sentence(
+        # Served from the agent's pre-generated pool (tone is validated by MotivationalRequest);
+        # runs in a thread because an empty bucket still calls the LLM synchronously
+        sentence = await asyncio.to_thread(
+            agent.get_motivational_sentence,
             tone=request.tone,
             day_of_week=request.day_of_week
         )
@@ -1,18 +1,62 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException, Form, Request
+from fastapi import APIRouter, BackgroundTasks, File, UploadFile, HTTPException, Form, Request
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import BinaryIO, Optional
 import uvicorn
+import asyncio
 import base64
+import hashlib
 import io
+import json
 import os
-import httpx
-from PIL import Image
-from app.api.v1.agents import get_supervisor
+import re
+import logging
+from PIL import Image, ImageOps
+from app.api.v1.agents import get_supervisor, RECOMMENDATIONS_DIR
 from pathlib import Path
-from openai import OpenAI
+from openai import AsyncOpenAI
+from cachetools import TTLCache
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Vision only needs low-detail tiles, so downscale uploads before sending them
+VISION_MAX_EDGE = 1024
+VISION_JPEG_QUALITY = 85
+
+# Slow-path patterns for pulling JSON out of a non-JSON Vision reply
+_FENCE_RE = re.compile(r'```(?:json)?\s*(.*?)\s*```', re.DOTALL)
+_OBJ_RE = re.compile(r'\{[^{}]*"gender"[^{}]*"body_type"[^{}]*\}', re.DOTALL)
+
+# Magic numbers of the common photo formats (JPEG, PNG, GIF, TIFF); weak
+# signatures such as BMP's two-byte "BM" are left for PIL to identify
+_IMAGE_SIGNATURES = (
+    b"\xff\xd8\xff",
+    b"\x89PNG\r\n\x1a\n",
+    b"GIF87a",
+    b"GIF89a",
+    b"II*\x00",
+    b"MM\x00*",
+)
+
+# Uploads are hashed in chunks of this size straight from the spooled file
+HASH_CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+# Classification results keyed by a hash of the three uploaded images,
+# so re-uploads of the same photos (e.g. retries) skip the Vision call
+_classification_cache = TTLCache(maxsize=1024, ttl=24 * 60 * 60)
+
+def _get_openai_client(request: Request, api_key: str) -> AsyncOpenAI:
+    """Get the OpenAI client created at startup (bound to the app-wide HTTP/2 pool)
+    
+    Apps started without the lifespan get one on first use, stored on app.state
+    so it never outlives the app whose HTTP client it uses
+    """
+    client = getattr(request.app.state, "openai", None)
+    if client is None:
+        client = AsyncOpenAI(api_key=api_key, http_client=getattr(request.app.state, "http", None))
+        request.app.state.openai = client
+    return client
 
 
 class ClassificationRequest(BaseModel):
@@ -28,8 +72,83 @@ class ClassificationResponse(BaseModel):
     recommendations: Optional[dict] = None
 
 
+def _validate_image(image_file: BinaryIO):
+    """Raise if the uploaded file is not an image (checks the header only)"""
+    image_file.seek(0)
+    header = image_file.read(12)
+    if header.startswith(_IMAGE_SIGNATURES) or (header[:4] == b"RIFF" and header[8:12] == b"WEBP"):
+        return
+    # Less common formats: let PIL identify the header (pixel data is not decoded)
+    image_file.seek(0)
+    with Image.open(image_file):
+        pass
+
+
+def _images_cache_key(*image_files: BinaryIO) -> str:
+    """Content hash of the uploaded images (per-image digests keep boundaries unambiguous)"""
+    hasher = hashlib.blake2b(digest_size=16)
+    for image_file in image_files:
+        image_file.seek(0)
+        image_hasher = hashlib.blake2b(digest_size=16)
+        while chunk := image_file.read(HASH_CHUNK_SIZE):
+            image_hasher.update(chunk)
+        hasher.update(image_hasher.digest())
+    return hasher.hexdigest()
+
+
+def _downscale_image(image_file: BinaryIO) -> bytes:
+    """Resize to VISION_MAX_EDGE on the longest side and recompress as JPEG"""
+    image_file.seek(0)
+    with Image.open(image_file) as image:
+        # Apply EXIF rotation first since re-encoding drops the orientation tag
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((VISION_MAX_EDGE, VISION_MAX_EDGE), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        image.convert("RGB").save(buffer, "JPEG", quality=VISION_JPEG_QUALITY)
+    return buffer.getvalue()
+
+
+def _image_to_data_url(image_file: BinaryIO) -> str:
+    """Downscale an uploaded image and encode it as a base64 data URL for the OpenAI Vision API"""
+    jpeg_data = _downscale_image(image_file)
+    return f"data:image/jpeg;base64,{base64.b64encode(jpeg_data).decode('ascii')}"
+
+
+def _write_plan(file_path: Path, markdown: str):
+    """Write a generated plan to disk (runs as a background task after the response)"""
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(markdown)
+
+
+def _strip_fences_and_extract(result_text: str) -> str:
+    """Slow path: pull the JSON object out of a response wrapped in markdown or extra text"""
+    # Remove markdown code blocks if present
+    if result_text.startswith("```"):
+        # Extract content from code blocks
+        match = _FENCE_RE.search(result_text)
+        if match:
+            result_text = match.group(1).strip()
+        else:
+            # Fallback: try to extract between first and last ```
+            parts = result_text.split("```")
+            if len(parts) >= 3:
+                result_text = parts[1]
+                if result_text.startswith("json"):
+                    result_text = result_text[4:]
+                result_text = result_text.strip()
+    
+    # Try to extract JSON object if there's extra text
+    json_match = _OBJ_RE.search(result_text)
+    if json_match:
+        result_text = json_match.group(0)
+    
+    return result_text.strip()
+
+
 @router.post("/body-type", response_model=ClassificationResponse)
 async def classify_body_type(
+    request: Request,
+    background_tasks: BackgroundTasks,
     front_image: UploadFile = File(...),
     left_image: UploadFile = File(...),
     right_image: UploadFile = File(...)
@@ -40,54 +159,62 @@ async def classify_body_type(
     This endpoint receives three images and returns the classified body type.
     Currently returns a placeholder response as the actual ML model integration is pending.
     """
-    print(f"📸 Classification request received")
+    logger.info("📸 Classification request received")
     try:
         # Validate that all three images are provided
         if not front_image or not left_image or not right_image:
-            print(f"❌ Missing images")
+            logger.warning("❌ Missing images")
             raise HTTPException(status_code=400, detail="All three images are required")
         
-        print(f"✅ All images provided")
-        
-        # Read and validate images
-        print(f"📖 Reading image data...")
-        front_data = await front_image.read()
-        left_data = await left_image.read()
-        right_data = await right_image.read()
-        print(f"✅ Images read (sizes: {len(front_data)}, {len(left_data)}, {len(right_data)} bytes)")
+        # Work on the spooled upload files directly instead of copying them into bytes
+        front_file, left_file, right_file = front_image.file, left_image.file, right_image.file
+        logger.debug("✅ Images received (sizes: %s, %s, %s bytes)", front_image.size, left_image.size, right_image.size)
         
         # Basic validation - check if files are actually images
+        # Decoding is blocking work, so validate all three concurrently off the event loop
         try:
-            Image.open(io.BytesIO(front_data))
-            Image.open(io.BytesIO(left_data))
-            Image.open(io.BytesIO(right_data))
-            print(f"✅ Images validated as valid image files")
+            await asyncio.gather(
+                asyncio.to_thread(_validate_image, front_file),
+                asyncio.to_thread(_validate_image, left_file),
+                asyncio.to_thread(_validate_image, right_file)
+            )
+            logger.debug("✅ Images validated as valid image files")
         except Exception as e:
-            print(f"❌ Image validation failed: {str(e)}")
+            logger.warning("❌ Image validation failed: %s", e)
             raise HTTPException(status_code=400, detail=f"Invalid image file: {str(e)}")
         
+        # Identical uploads reuse the previous classification
+        cache_key = await asyncio.to_thread(_images_cache_key, front_file, left_file, right_file)
+        cached_classification = _classification_cache.get(cache_key)
+        
         # Detect gender and body type using OpenAI Vision API
-        print(f"🤖 Starting AI classification (gender + body type)...")
+        logger.debug("🤖 Starting AI classification (gender + body type)...")
         openai_key = os.getenv("OPENAI_API_KEY")
         if not openai_key:
-            print(f"⚠️ OPENAI_API_KEY not set, using defaults")
+            logger.warning("⚠️ OPENAI_API_KEY not set, using defaults")
             body_type = "Endomorph"
             gender = "male"
+        elif cached_classification is not None:
+            gender, body_type, confidence = cached_classification
+            logger.info("♻️ Reusing cached classification for identical images")
         else:
+            # Prepare images for OpenAI Vision (encoded concurrently off the event loop)
+            # The header check doesn't decode pixel data, so a corrupt image only fails here
             try:
-                client = OpenAI(api_key=openai_key)
-                
-                # Convert images to base64 for OpenAI Vision API
-                def image_to_base64(image_data):
-                    return base64.b64encode(image_data).decode('utf-8')
-                
-                # Prepare images for OpenAI Vision
-                front_b64 = image_to_base64(front_data)
-                left_b64 = image_to_base64(left_data)
-                right_b64 = image_to_base64(right_data)
+                front_url, left_url, right_url = await asyncio.gather(
+                    asyncio.to_thread(_image_to_data_url, front_file),
+                    asyncio.to_thread(_image_to_data_url, left_file),
+                    asyncio.to_thread(_image_to_data_url, right_file)
+                )
+            except Exception as e:
+                logger.warning("❌ Image decoding failed: %s", e)
+                raise HTTPException(status_code=400, detail=f"Invalid image file: {str(e)}")
+            
+            try:
+                client = _get_openai_client(request, openai_key)
                 
-                # Call OpenAI Vision API to detect gender and body type
-                response = client.chat.completions.create(
+                # Call OpenAI Vision API to detect gender and body type (awaited so other requests keep running)
+                response = await client.chat.completions.create(
                     model="gpt-4o-mini",
                     messages=[
                         {
@@ -104,79 +231,60 @@ async def classify_body_type(
                                 {
                                     "type": "image_url",
                                     "image_url": {
-                                        "url": f"data:image/jpeg;base64,{front_b64}"
+                                        "url": front_url,
+                                        "detail": "low"
                                     }
                                 },
                                 {
                                     "type": "image_url",
                                     "image_url": {
-                                        "url": f"data:image/jpeg;base64,{left_b64}"
+                                        "url": left_url,
+                                        "detail": "low"
                                     }
                                 },
                                 {
                                     "type": "image_url",
                                     "image_url": {
-                                        "url": f"data:image/jpeg;base64,{right_b64}"
+                                        "url": right_url,
+                                        "detail": "low"
                                     }
                                 }
                             ]
                         }
                     ],
                     max_tokens=200,
-                    temperature=0.3
+                    temperature=0.3,
+                    response_format={"type": "json_object"}
                 )
                 
                 # Parse the response
-                import json
-                import re
-                
                 result_text = response.choices[0].message.content.strip()
-                print(f"🔍 Raw OpenAI response: {result_text[:200]}...")  # Debug: show first 200 chars
-                
-                # Remove markdown code blocks if present
-                if result_text.startswith("```"):
-                    # Extract content from code blocks
-                    match = re.search(r'```(?:json)?\s*(.*?)\s*```', result_text, re.DOTALL)
-                    if match:
-                        result_text = match.group(1).strip()
-                    else:
-                        # Fallback: try to extract between first and last ```
-                        parts = result_text.split("```")
-                        if len(parts) >= 3:
-                            result_text = parts[1]
-                            if result_text.startswith("json"):
-                                result_text = result_text[4:]
-                            result_text = result_text.strip()
-                
-                # Try to extract JSON object if there's extra text
-                json_match = re.search(r'\{[^{}]*"gender"[^{}]*"body_type"[^{}]*\}', result_text, re.DOTALL)
-                if json_match:
-                    result_text = json_match.group(0)
-                
-                result_text = result_text.strip()
-                print(f"🔍 Parsed JSON text: {result_text[:200]}...")  # Debug
+                logger.debug("🔍 Raw OpenAI response: %.200s...", result_text)
                 
-                # Parse JSON response
+                # Fast path: JSON mode means the response is normally a bare JSON object
                 try:
                     result = json.loads(result_text)
-                except json.JSONDecodeError as e:
-                    print(f"❌ JSON decode error: {str(e)}")
-                    print(f"❌ Failed to parse: {result_text}")
-                    raise ValueError(f"Invalid JSON response from AI: {str(e)}")
+                except json.JSONDecodeError:
+                    result_text = _strip_fences_and_extract(result_text)
+                    logger.debug("🔍 Parsed JSON text: %.200s...", result_text)
+                    try:
+                        result = json.loads(result_text)
+                    except json.JSONDecodeError as e:
+                        logger.error("❌ JSON decode error: %s (failed to parse: %s)", e, result_text)
+                        raise ValueError(f"Invalid JSON response from AI: {str(e)}")
                 
                 # Handle case where result might be a list (shouldn't happen, but just in case)
                 if isinstance(result, list):
-                    print(f"⚠️ Warning: Response is a list with {len(result)} elements")
+                    logger.warning("⚠️ Response is a list with %d elements", len(result))
                     if len(result) > 0 and isinstance(result[0], dict):
                         result = result[0]
-                        print(f"✅ Using first element from list")
+                        logger.debug("✅ Using first element from list")
                     else:
                         raise ValueError("Invalid response format: list without dict elements")
                 
                 # Ensure result is a dictionary
                 if not isinstance(result, dict):
-                    print(f"❌ Result is not a dict, it's: {type(result)}")
-                    print(f"❌ Result value: {result}")
+                    logger.error("❌ Result is not a dict, it's %s: %r", type(result), result)
                     raise ValueError(f"Invalid response format: expected dict, got {type(result)}")
                 
                 # Extract values with validation
@@ -184,7 +292,7 @@ async def classify_body_type(
                 if gender and isinstance(gender, str):
                     gender = gender.lower().strip()
                     if gender not in ["male", "female"]:
-                        print(f"⚠️ Invalid gender '{gender}', defaulting to 'male'")
+                        logger.warning("⚠️ Invalid gender '%s', defaulting to 'male'", gender)
                         gender = "male"
                 else:
                     gender = "male"
@@ -201,7 +309,7 @@ async def classify_body_type(
                     elif "endomorph" in body_type_lower:
                         body_type = "Endomorph"
                     else:
-                        print(f"⚠️ Invalid body type '{body_type}', defaulting to 'Endomorph'")
+                        logger.warning("⚠️ Invalid body type '%s', defaulting to 'Endomorph'", body_type)
                         body_type = "Endomorph"
                 else:
                     body_type = "Endomorph"
@@ -214,16 +322,16 @@ async def classify_body_type(
                 else:
                     confidence = 0.85
                 
-                print(f"✅ AI Classification complete:")
-                print(f"   Gender: {gender}")
-                print(f"   Body Type: {body_type}")
-                print(f"   Confidence: {confidence}")
+                logger.info(
+                    "✅ AI Classification complete: gender=%s body_type=%s confidence=%s",
+                    gender, body_type, confidence
+                )
+                
+                # Only successful classifications are cached (not the fallback defaults)
+                _classification_cache[cache_key] = (gender, body_type, confidence)
                 
             except Exception as e:
-                print(f"⚠️ AI classification failed: {str(e)}")
-                print(f"   Using default values")
-                import traceback
-                traceback.print_exc()
+                logger.exception("⚠️ AI classification failed, using default values: %s", e)
                 # Fallback to defaults
                 body_type = "Endomorph"
                 gender = "male"
@@ -231,41 +339,39 @@ async def classify_body_type(
         
         # Generate fitness recommendations using the agent system
         try:
-            print(f"🚀 Starting agent system call for body type: {body_type}")
-            print(f"🔑 Checking OPENAI_API_KEY...")
+            logger.info("🚀 Starting agent system call for body type: %s", body_type)
             openai_key = os.getenv("OPENAI_API_KEY")
             if not openai_key:
                 raise ValueError("OPENAI_API_KEY environment variable is not set")
-            print(f"✅ OPENAI_API_KEY is set (length: {len(openai_key)} chars)")
             
             # Call the agent system directly (same process, no HTTP needed)
-            print(f"📞 Calling get_supervisor()...")
-            supervisor_agent = get_supervisor()
-            print(f"✅ Supervisor agent initialized")
+            supervisor_agent = get_supervisor(request)
             
             goals = f"Create a personalized 4-week fitness plan for a {body_type} body type focusing on balanced training and nutrition"
-            print(f"📋 Generating recommendations with goals: {goals[:50]}...")
+            logger.debug("📋 Generating recommendations with goals: %.50s...", goals)
             
-            result = supervisor_agent.generate_recommendations(
+            # The agent pipeline makes blocking LLM calls; keep it off the event loop
+            result = await asyncio.to_thread(
+                supervisor_agent.generate_recommendations,
                 body_type=body_type.lower(),
                 goals=goals,
                 max_iterations=2
             )
             
-            print(f"✅ Agent system returned recommendations")
-            print(f"📊 Result keys: {list(result.keys())}")
-            print(f"🍎 Diet recommendation length: {len(result.get('diet_recommendation', ''))} chars")
-            print(f"💪 Exercise recommendation length: {len(result.get('exercise_recommendation', ''))} chars")
+            logger.info("✅ Agent system returned recommendations")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "📊 Result keys: %s (diet %d chars, exercise %d chars)",
+                    list(result.keys()),
+                    len(result.get('diet_recommendation', '')),
+                    len(result.get('exercise_recommendation', ''))
+                )
             
-            # Save markdown file
-            output_dir = Path("data/recommendations")
-            output_dir.mkdir(parents=True, exist_ok=True)
+            # Save markdown file after the response is sent
             timestamp = result['generated_at'].replace(':', '-').replace('.', '-')
             filename = f"plan_{body_type.lower()}_{timestamp}.md"
-            file_path = output_dir / filename
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(result['markdown'])
+            file_path = RECOMMENDATIONS_DIR / filename
+            background_tasks.add_task(_write_plan, file_path, result['markdown'])
             
             return JSONResponse(
                 status_code=200,
@@ -280,10 +386,7 @@ async def classify_body_type(
             )
         except Exception as e:
             # If agent system is not available, return basic classification
-            print(f"❌ Agent system call failed: {str(e)}")
-            print(f"Error type: {type(e).__name__}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ Agent system call failed (%s): %s", type(e).__name__, e)
             return JSONResponse(
                 status_code=200,
                 content={
@@ -301,10 +404,7 @@ async def classify_body_type(
     except Exception as e:
         # Log the error but return a response instead of raising HTTPException
         # This prevents the 502 error and allows the frontend to handle it gracefully
-        print(f"❌ Classification endpoint error: {str(e)}")
-        print(f"❌ Error type: {type(e).__name__}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Classification endpoint error (%s): %s", type(e).__name__, e)
         
         # Return a proper JSON response instead of raising exception
         return JSONResponse(
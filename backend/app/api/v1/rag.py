@@ -3,110 +3,147 @@ RAG API Routes
 Endpoints for document upload and retrieval
 """
 
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import List, Optional
+import asyncio
+import hashlib
 import os
+import orjson
 from pathlib import Path
 from app.services.rag_manager import get_diet_rag, get_exercise_rag
+from app.services.agent_tools import bust_rag_cache
+from app.services.diet_rag import DietRAG
+from app.services.exercise_rag import ExerciseRAG
 
 router = APIRouter(prefix="/rag", tags=["RAG"])
 
-# Use lazy-loaded RAG systems from main.py (reduces startup memory)
+# RAG systems are lazy-loaded singletons, resolved once per request via Depends
 
 # Directory for uploaded files
 UPLOAD_DIR = Path("data/uploads")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
+# Document types the RAG systems can ingest
+ALLOWED_EXTENSIONS = ['.pdf', '.docx', '.txt', '.md']
 
-@router.post("/diet/upload")
-async def upload_diet_document(file: UploadFile = File(...)):
+# Uploads are streamed to disk in chunks of this size
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+
+async def _save_upload(file: UploadFile, file_path: Path) -> str:
+    """Stream an uploaded file to disk without holding it all in memory
+    
+    Returns the content hash, computed while writing. The size limit is enforced
+    earlier, while the request body arrives (see UploadSizeLimitMiddleware)
     """
-    Upload a diet/nutrition document
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(file_path, "wb") as buffer:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            hasher.update(chunk)
+            buffer.write(chunk)
+    return hasher.hexdigest()
+
+
+def _stream_search(rag, query: str, k: int):
+    """Serialize search hits one at a time into the {query, results, count} JSON body"""
+    yield b'{"query":' + orjson.dumps(query) + b',"results":['
+    count = 0
+    for hit in rag.search_iter(query, k):
+        yield (b',' if count else b'') + orjson.dumps(hit)
+        count += 1
+    yield b'],"count":' + str(count).encode() + b'}'
+
+
+async def _process_folder(rag, folder_path: str) -> dict:
+    """Process unprocessed files in a folder in a worker thread
     
-    Supported formats: PDF, DOCX, TXT, MD
+    process_folder itself parses the files in parallel worker processes
     """
+    # process_folder blocks while the worker processes run; keep it off the event loop
+    results = await asyncio.to_thread(rag.process_folder, folder_path)
+    if results["processed"]:
+        bust_rag_cache()
+    return results
+
+
+async def _handle_upload(file: UploadFile, rag, prefix: str):
+    """Validate, save and ingest an uploaded document into the given RAG system"""
     try:
         # Validate file type
-        allowed_extensions = ['.pdf', '.docx', '.txt', '.md']
         file_ext = Path(file.filename).suffix.lower()
         
-        if file_ext not in allowed_extensions:
+        if file_ext not in ALLOWED_EXTENSIONS:
             raise HTTPException(
                 status_code=400,
-                detail=f"Unsupported file type. Allowed: {allowed_extensions}"
+                detail=f"Unsupported file type. Allowed: {ALLOWED_EXTENSIONS}"
             )
         
         # Save uploaded file
-        file_path = UPLOAD_DIR / f"diet_{file.filename}"
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        file_path = UPLOAD_DIR / f"{prefix}_{file.filename}"
+        content_hash = await _save_upload(file, file_path)
+        
+        # Skip re-chunking and re-embedding documents that were already ingested; the
+        # claim is atomic, so concurrent identical uploads are ingested only once
+        if not rag.claim_document(content_hash):
+            return JSONResponse(
+                content={
+                    "message": "Document already ingested",
+                    "filename": file.filename,
+                    "total_documents": rag.get_document_count()
+                }
+            )
         
-        # Add to Diet RAG (lazy loads if needed)
-        diet_rag = get_diet_rag()
-        success = diet_rag.add_document(str(file_path))
+        # Parsing, chunking and embedding are blocking; keep them off the event loop
+        # (add_document releases the claim when it finishes)
+        success = await asyncio.to_thread(rag.add_document, str(file_path), content_hash)
         
         if success:
+            bust_rag_cache()
             return JSONResponse(
                 content={
                     "message": "Document uploaded successfully",
                     "filename": file.filename,
-                    "total_documents": diet_rag.get_document_count()
+                    "total_documents": rag.get_document_count()
                 }
             )
         else:
             raise HTTPException(status_code=500, detail="Failed to process document")
-            
+    
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/diet/upload")
+async def upload_diet_document(
+    file: UploadFile = File(...),
+    diet_rag: DietRAG = Depends(get_diet_rag)
+):
+    """
+    Upload a diet/nutrition document
+    
+    Supported formats: PDF, DOCX, TXT, MD
+    """
+    return await _handle_upload(file, diet_rag, "diet")
+
+
 @router.post("/exercise/upload")
-async def upload_exercise_document(file: UploadFile = File(...)):
+async def upload_exercise_document(
+    file: UploadFile = File(...),
+    exercise_rag: ExerciseRAG = Depends(get_exercise_rag)
+):
     """
     Upload an exercise/workout document
     
     Supported formats: PDF, DOCX, TXT, MD
     """
-    try:
-        # Validate file type
-        allowed_extensions = ['.pdf', '.docx', '.txt', '.md']
-        file_ext = Path(file.filename).suffix.lower()
-        
-        if file_ext not in allowed_extensions:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Unsupported file type. Allowed: {allowed_extensions}"
-            )
-        
-        # Save uploaded file
-        file_path = UPLOAD_DIR / f"exercise_{file.filename}"
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-        
-        # Add to Exercise RAG (lazy loads if needed)
-        exercise_rag = get_exercise_rag()
-        success = exercise_rag.add_document(str(file_path))
-        
-        if success:
-            return JSONResponse(
-                content={
-                    "message": "Document uploaded successfully",
-                    "filename": file.filename,
-                    "total_documents": exercise_rag.get_document_count()
-                }
-            )
-        else:
-            raise HTTPException(status_code=500, detail="Failed to process document")
-            
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return await _handle_upload(file, exercise_rag, "exercise")
 
 
 @router.get("/diet/search")
-async def search_diet(query: str, k: int = 3):
+async def search_diet(query: str, k: int = 3, diet_rag: DietRAG = Depends(get_diet_rag)):
     """
     Search in diet/nutrition documents
     
@@ -114,20 +151,12 @@ async def search_diet(query: str, k: int = 3):
         query: Search query
         k: Number of results to return (default: 3)
     """
-    try:
-        diet_rag = get_diet_rag()
-        results = diet_rag.search(query, k)
-        return {
-            "query": query,
-            "results": results,
-            "count": len(results)
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    # Hits are streamed as they are serialized (the sync generator runs in the threadpool)
+    return StreamingResponse(_stream_search(diet_rag, query, k), media_type="application/json")
 
 
 @router.get("/exercise/search")
-async def search_exercise(query: str, k: int = 3):
+async def search_exercise(query: str, k: int = 3, exercise_rag: ExerciseRAG = Depends(get_exercise_rag)):
     """
     Search in exercise/workout documents
     
@@ -135,22 +164,13 @@ async def search_exercise(query: str, k: int = 3):
         query: Search query
         k: Number of results to return (default: 3)
     """
-    try:
-        exercise_rag = get_exercise_rag()
-        results = exercise_rag.search(query, k)
-        return {
-            "query": query,
-            "results": results,
-            "count": len(results)
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    # Hits are streamed as they are serialized (the sync generator runs in the threadpool)
+    return StreamingResponse(_stream_search(exercise_rag, query, k), media_type="application/json")
 
 
 @router.get("/diet/stats")
-async def diet_stats():
+async def diet_stats(diet_rag: DietRAG = Depends(get_diet_rag)):
     """Get statistics about diet RAG system"""
-    diet_rag = get_diet_rag()
     return {
         "document_count": diet_rag.get_document_count(),
         "type": "diet",
@@ -159,9 +179,8 @@ async def diet_stats():
 
 
 @router.get("/exercise/stats")
-async def exercise_stats():
+async def exercise_stats(exercise_rag: ExerciseRAG = Depends(get_exercise_rag)):
     """Get statistics about exercise RAG system"""
-    exercise_rag = get_exercise_rag()
     return {
         "document_count": exercise_rag.get_document_count(),
         "type": "exercise",
@@ -170,36 +189,34 @@ async def exercise_stats():
 
 
 @router.delete("/diet/clear")
-async def clear_diet():
+async def clear_diet(diet_rag: DietRAG = Depends(get_diet_rag)):
     """Clear all diet documents"""
-    diet_rag = get_diet_rag()
     diet_rag.clear()
+    bust_rag_cache()
     return {"message": "Diet RAG cleared"}
 
 
 @router.delete("/exercise/clear")
-async def clear_exercise():
+async def clear_exercise(exercise_rag: ExerciseRAG = Depends(get_exercise_rag)):
     """Clear all exercise documents"""
-    exercise_rag = get_exercise_rag()
     exercise_rag.clear()
+    bust_rag_cache()
     return {"message": "Exercise RAG cleared"}
 
 
 @router.post("/diet/process-folder")
-async def process_diet_folder():
+async def process_diet_folder(diet_rag: DietRAG = Depends(get_diet_rag)):
     """Process all documents from data/diet_documents/ folder"""
-    diet_rag = get_diet_rag()
     folder_path = "data/diet_documents"
-    results = diet_rag.process_folder(folder_path)
+    results = await _process_folder(diet_rag, folder_path)
     return JSONResponse(content=results)
 
 
 @router.post("/exercise/process-folder")
-async def process_exercise_folder():
+async def process_exercise_folder(exercise_rag: ExerciseRAG = Depends(get_exercise_rag)):
     """Process all documents from data/exercise_documents/ folder"""
-    exercise_rag = get_exercise_rag()
     folder_path = "data/exercise_documents"
-    results = exercise_rag.process_folder(folder_path)
+    results = await _process_folder(exercise_rag, folder_path)
     return JSONResponse(content=results)
 
 
@@ -0,0 +1,82 @@
+"""
+Upload size limits shared by the file upload endpoints
+"""
+
+from typing import Dict
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+# Largest request body accepted by the upload endpoints
+MAX_DOCUMENT_UPLOAD_BYTES = 25 * 1024 * 1024  # 25 MB (one RAG document)
+MAX_IMAGE_UPLOAD_BYTES = 30 * 1024 * 1024  # 30 MB (three body images)
+
+# Request body limit per upload path
+UPLOAD_LIMITS = {
+    "/rag/diet/upload": MAX_DOCUMENT_UPLOAD_BYTES,
+    "/rag/exercise/upload": MAX_DOCUMENT_UPLOAD_BYTES,
+    "/api/v1/classify/body-type": MAX_IMAGE_UPLOAD_BYTES,
+}
+
+
+def _too_large_detail(max_bytes: int) -> str:
+    return f"Upload too large. Maximum size is {max_bytes // (1024 * 1024)} MB"
+
+
+class UploadSizeLimitMiddleware:
+    """ASGI middleware that enforces UPLOAD_LIMITS before the body is parsed
+
+    FastAPI parses multipart forms before running route dependencies, so the
+    limit has to sit in front of the app: a Content-Length over the limit is
+    rejected without reading the body, and bodies without one (chunked uploads)
+    are counted as they arrive and cut off as soon as they pass the limit
+    """
+
+    def __init__(self, app, limits: Dict[str, int] = UPLOAD_LIMITS):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        max_bytes = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if max_bytes is None:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None:
+            try:
+                length = int(content_length)
+            except ValueError:
+                await JSONResponse({"detail": "Invalid Content-Length header"}, status_code=400)(scope, receive, send)
+                return
+            if length > max_bytes:
+                await JSONResponse({"detail": _too_large_detail(max_bytes)}, status_code=413)(scope, receive, send)
+                return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    # Raised while the form is being parsed; FastAPI re-raises
+                    # HTTPExceptions from body parsing, so this becomes a 413
+                    raise HTTPException(status_code=413, detail=_too_large_detail(max_bytes))
+            return message
+
+        response_started = False
+
+        async def tracked_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except HTTPException as exc:
+            # Body read outside the route's exception handling (e.g. by another middleware)
+            if exc.status_code != 413 or response_started:
+                raise
+            await JSONResponse({"detail": exc.detail}, status_code=413)(scope, receive, send)
@@ -3,14 +3,13 @@ User Data API - Store and retrieve user fitness data
 """
 
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
 
 from app.database import (
-    create_user,
-    save_classification,
-    save_plans,
+    save_user_classification_and_plans,
     get_user_latest_plan,
     get_user_classifications,
     user_exists
@@ -50,24 +49,12 @@ async def save_classification_result(request: SaveClassificationRequest):
     - Timestamps will reflect the new upload
     """
     try:
-        # Create or get user
-        user_id = create_user(
+        # Create/get user, save classification and plans in one transaction
+        user_id, classification_id, plan_id = await run_in_threadpool(
+            save_user_classification_and_plans,
             clerk_user_id=request.clerk_user_id,
-            email=None,  # Could get from Clerk if needed
-            name=None
-        )
-        
-        # Save classification
-        classification_id = save_classification(
-            user_id=user_id,
             body_type=request.body_type,
-            gender=request.gender
-        )
-        
-        # Save plans
-        plan_id = save_plans(
-            user_id=user_id,
-            classification_id=classification_id,
+            gender=request.gender,
             workout_plan=request.workout_plan,
             meal_plan=request.meal_plan
         )
@@ -3,27 +3,228 @@ Database initialization and connection
 """
 
 import sqlite3
+import logging
+import threading
 from pathlib import Path
 from datetime import datetime
+from cachetools import TTLCache
+from app.database_pool import SQLitePool
+
+logger = logging.getLogger(__name__)
 
 
 # Database file path
 DB_PATH = Path("data/fitness.db")
+
+# Short-lived cache of user_exists answers, keyed by Clerk ID
+# Kept in sync by create_user / save_user_classification_and_plans / delete_user_from_db
+USER_EXISTS_TTL_SECONDS = 60
+_user_exists_cache = TTLCache(maxsize=4096, ttl=USER_EXISTS_TTL_SECONDS)
+_user_exists_lock = threading.Lock()
 DB_PATH.parent.mkdir(parents=True, exist_ok=True)
 
 
+# Hot-path SQL, kept as constants so every call reuses the exact same text
+# (the per-connection statement cache is keyed on the SQL string)
+SQL_GET_USER_ID_BY_CLERK_ID = "SELECT id FROM users WHERE clerk_user_id = ?"
+SQL_UPSERT_USER = """
+    INSERT INTO users (clerk_user_id, email, name)
+    VALUES (?, ?, ?)
+    ON CONFLICT(clerk_user_id) DO UPDATE SET clerk_user_id = excluded.clerk_user_id
+    RETURNING id
+"""
+SQL_UPSERT_CLASSIFICATION = """
+    INSERT INTO classifications (user_id, body_type, gender)
+    VALUES (?, ?, ?)
+    ON CONFLICT(user_id) DO UPDATE SET
+        body_type = excluded.body_type,
+        gender = excluded.gender,
+        created_at = CURRENT_TIMESTAMP
+    RETURNING id
+"""
+SQL_UPSERT_PLAN = """
+    INSERT INTO fitness_plans 
+    (user_id, classification_id, clerk_user_id)
+    VALUES (?1, ?2, (SELECT clerk_user_id FROM users WHERE id = ?1))
+    ON CONFLICT(classification_id) DO UPDATE SET
+        created_at = CURRENT_TIMESTAMP
+    RETURNING id
+"""
+SQL_UPSERT_PLAN_BODY = """
+    INSERT INTO fitness_plan_bodies (plan_id, workout_plan, meal_plan)
+    VALUES (?, ?, ?)
+    ON CONFLICT(plan_id) DO UPDATE SET
+        workout_plan = excluded.workout_plan,
+        meal_plan = excluded.meal_plan
+"""
+SQL_GET_USER_LATEST_PLAN = """
+    SELECT 
+        f.id,
+        b.workout_plan,
+        b.meal_plan,
+        f.created_at,
+        c.body_type,
+        c.gender,
+        c.id as classification_id
+    FROM fitness_plans f
+    JOIN classifications c ON f.classification_id = c.id
+    LEFT JOIN fitness_plan_bodies b ON b.plan_id = f.id
+    WHERE f.clerk_user_id = ?
+    ORDER BY f.created_at DESC
+    LIMIT 1
+"""
+SQL_GET_USER_CLASSIFICATIONS = """
+    SELECT 
+        c.id,
+        c.body_type,
+        c.gender,
+        c.created_at
+    FROM classifications c
+    JOIN users u ON c.user_id = u.id
+    WHERE u.clerk_user_id = ?
+    ORDER BY c.created_at DESC
+"""
+SQL_DELETE_USER = "DELETE FROM users WHERE clerk_user_id = ? RETURNING id"
+SQL_GET_USERS_VERSION = "SELECT value FROM metadata WHERE key = 'users_version'"
+
+
+
+# Read statements run on nearly every request; compiled into each pooled
+# connection's statement cache as soon as the connection is opened
+HOT_READ_STATEMENTS = (
+    (SQL_GET_USER_ID_BY_CLERK_ID, ("",)),
+    (SQL_GET_USER_LATEST_PLAN, ("",)),
+    (SQL_GET_USER_CLASSIFICATIONS, ("",)),
+    (SQL_GET_USERS_VERSION, ()),
+)
+
+
+def _warm_statement_cache(conn: sqlite3.Connection):
+    """Prepare the hot read statements once so they stay cached for the connection's lifetime"""
+    for sql, params in HOT_READ_STATEMENTS:
+        try:
+            conn.execute(sql, params).fetchall()
+        except sqlite3.OperationalError:
+            # Tables don't exist yet (first connection, before init_database)
+            return
+
+
+def _configure_connection(conn: sqlite3.Connection):
+    """Per-connection PRAGMAs, applied once when the pool opens a connection"""
+    conn.execute("PRAGMA journal_mode=WAL")  # Readers don't block the writer
+    conn.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL, far fewer fsyncs
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-64000")  # 64 MB page cache per connection
+    conn.execute("PRAGMA mmap_size=268435456")  # 256 MB memory-mapped reads
+    conn.execute("PRAGMA wal_autocheckpoint=1000")  # Checkpoint every ~1000 pages (~4 MB)
+    conn.execute("PRAGMA journal_size_limit=67108864")  # Truncate the WAL back to 64 MB after checkpoints
+    conn.execute("PRAGMA foreign_keys=ON")  # Off by default; needed for ON DELETE CASCADE
+    _warm_statement_cache(conn)
+
+
+# Shared connection pool (connections are reused across requests)
+db_pool = SQLitePool(
+    DB_PATH,
+    pool_size=20,
+    max_overflow=10,
+    pool_timeout=30.0,
+    pre_ping=True,
+    on_connect=_configure_connection,
+    cached_statements=256
+)
+
+
 def get_db_connection():
-    """Get SQLite database connection"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row  # Return dict-like rows
-    return conn
+    """Get a pooled SQLite connection
+    
+    Use as a context manager; the connection goes back to the pool on exit
+    (any uncommitted transaction is rolled back):
+    
+        with get_db_connection() as conn:
+            ...
+    """
+    return db_pool.connection()
+
+
+# Child tables of users; {name} lets the cascade migration build a replacement table
+CLASSIFICATIONS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        body_type TEXT NOT NULL,
+        gender TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    )
+"""
+FITNESS_PLANS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        classification_id INTEGER NOT NULL,
+        plan_version INTEGER DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        clerk_user_id TEXT,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+        FOREIGN KEY (classification_id) REFERENCES classifications(id) ON DELETE CASCADE
+    )
+"""
+
+# Plan text (multi-KB LLM output) lives in its own table so listing queries
+# over fitness_plans never read it
+FITNESS_PLAN_BODIES_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS fitness_plan_bodies (
+        plan_id INTEGER PRIMARY KEY,
+        workout_plan TEXT,
+        meal_plan TEXT,
+        FOREIGN KEY (plan_id) REFERENCES fitness_plans(id) ON DELETE CASCADE
+    )
+"""
 
 
 def init_database():
     """Initialize database with required tables"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    with get_db_connection() as conn:
+        # Table rebuilds copy rows as-is, so don't enforce foreign keys while migrating
+        conn.execute("PRAGMA foreign_keys=OFF")
+        try:
+            with conn:
+                _create_tables(conn.cursor())
+        finally:
+            conn.execute("PRAGMA foreign_keys=ON")
+    logger.info("✅ Database initialized successfully")
+
+
+def _add_cascade_foreign_keys(cursor, table: str, table_sql: str):
+    """Rebuild a table created before its foreign keys had ON DELETE CASCADE
+    
+    SQLite can't alter constraints in place, so copy into a new table and swap
+    (indexes and triggers on the old table are recreated by _create_tables)
+    """
+    foreign_keys = cursor.execute(f"PRAGMA foreign_key_list({table})").fetchall()
+    if all(fk['on_delete'] == 'CASCADE' for fk in foreign_keys):
+        return
     
+    _rebuild_table(cursor, table, table_sql)
+    logger.info("✅ Migrated %s foreign keys to ON DELETE CASCADE", table)
+
+
+def _rebuild_table(cursor, table: str, table_sql: str):
+    """Recreate a table from its current definition, keeping the columns both versions share"""
+    cursor.execute(table_sql.format(name=f"{table}_new"))
+    # Copy the columns both versions of the table have
+    new_columns = {row['name'] for row in cursor.execute(f"PRAGMA table_info({table}_new)").fetchall()}
+    columns = ", ".join(
+        row['name'] for row in cursor.execute(f"PRAGMA table_info({table})").fetchall()
+        if row['name'] in new_columns
+    )
+    cursor.execute(f"INSERT INTO {table}_new ({columns}) SELECT {columns} FROM {table}")
+    cursor.execute(f"DROP TABLE {table}")
+    cursor.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+
+
+def _create_tables(cursor):
+    """Create tables and triggers if they don't exist"""
     # Create users table
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS users (
@@ -36,30 +237,29 @@ def init_database():
     """)
     
     # Create classifications table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS classifications (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            body_type TEXT NOT NULL,
-            gender TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-    """)
+    cursor.execute(CLASSIFICATIONS_TABLE_SQL.format(name="classifications"))
     
     # Create fitness_plans table
+    cursor.execute(FITNESS_PLANS_TABLE_SQL.format(name="fitness_plans"))
+    
+    # Create fitness_plan_bodies table
+    cursor.execute(FITNESS_PLAN_BODIES_TABLE_SQL)
+    
+    # Older databases: move plan text out of fitness_plans (before any rebuild below)
+    _move_plan_bodies(cursor)
+    
+    # Older databases: deleting a user cascades to classifications and plans
+    _add_cascade_foreign_keys(cursor, "classifications", CLASSIFICATIONS_TABLE_SQL)
+    _add_cascade_foreign_keys(cursor, "fitness_plans", FITNESS_PLANS_TABLE_SQL)
+    
+    # Plans carry their owner's Clerk ID (denormalized) so the latest-plan lookup
+    # is one index seek instead of a join through users
+    _add_column_if_missing(cursor, "fitness_plans", "clerk_user_id", "TEXT")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_plans_clerk_created ON fitness_plans(clerk_user_id, created_at DESC)")
     cursor.execute("""
-        CREATE TABLE IF NOT EXISTS fitness_plans (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            classification_id INTEGER NOT NULL,
-            workout_plan TEXT,
-            meal_plan TEXT,
-            plan_version INTEGER DEFAULT 1,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id),
-            FOREIGN KEY (classification_id) REFERENCES classifications(id)
-        )
+        UPDATE fitness_plans
+        SET clerk_user_id = (SELECT clerk_user_id FROM users WHERE users.id = fitness_plans.user_id)
+        WHERE clerk_user_id IS NULL
     """)
     
     # Create admin_users table
@@ -73,237 +273,282 @@ def init_database():
         )
     """)
     
-    conn.commit()
-    conn.close()
-    print("✅ Database initialized successfully")
+    # One classification per user and one plan per classification
+    # (conflict targets for the UPSERTs in save_classification/save_plans)
+    _ensure_unique_index(cursor, "uq_classifications_user", "classifications", "user_id")
+    _ensure_unique_index(cursor, "uq_fitness_plans_classification", "fitness_plans", "classification_id")
+    
+    # Indexes for the hot lookups (latest classification per user, latest plan
+    # per classification, plans by user) so they are index seeks, not scans
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_class_user_created ON classifications(user_id, created_at DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_plans_class_created ON fitness_plans(classification_id, created_at DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_plans_user ON fitness_plans(user_id)")
+    
+    # Version counter bumped on any change to user-facing data
+    # (used as the ETag for admin user listings)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS metadata (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("INSERT OR IGNORE INTO metadata (key, value) VALUES ('users_version', 0)")
+    for table in ("users", "classifications", "fitness_plans"):
+        for action in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS bump_users_version_{table}_{action.lower()}
+                AFTER {action} ON {table}
+                BEGIN
+                    UPDATE metadata SET value = value + 1 WHERE key = 'users_version';
+                END
+            """)
 
 
-def create_user(clerk_user_id: str, email: str = None, name: str = None):
-    """Create or get user by Clerk ID"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def _move_plan_bodies(cursor):
+    """Move workout/meal plan text from fitness_plans into fitness_plan_bodies (older databases)"""
+    columns = {row['name'] for row in cursor.execute("PRAGMA table_info(fitness_plans)").fetchall()}
+    if "workout_plan" not in columns:
+        return
     
-    # Check if user exists
-    cursor.execute(
-        "SELECT id FROM users WHERE clerk_user_id = ?",
-        (clerk_user_id,)
-    )
-    existing = cursor.fetchone()
+    cursor.execute("""
+        INSERT OR IGNORE INTO fitness_plan_bodies (plan_id, workout_plan, meal_plan)
+        SELECT id, workout_plan, meal_plan FROM fitness_plans
+    """)
+    # ALTER TABLE ... DROP COLUMN needs SQLite 3.35+; older builds rebuild the table instead
+    if sqlite3.sqlite_version_info >= (3, 35, 0):
+        cursor.execute("ALTER TABLE fitness_plans DROP COLUMN workout_plan")
+        cursor.execute("ALTER TABLE fitness_plans DROP COLUMN meal_plan")
+    else:
+        _rebuild_table(cursor, "fitness_plans", FITNESS_PLANS_TABLE_SQL)
+    logger.info("✅ Moved plan text into fitness_plan_bodies")
+
+
+def _add_column_if_missing(cursor, table: str, column: str, column_type: str):
+    """Add a column to an existing table (older databases) if it isn't there yet"""
+    columns = {row['name'] for row in cursor.execute(f"PRAGMA table_info({table})").fetchall()}
+    if column not in columns:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+        logger.info("✅ Added %s.%s column", table, column)
+
+
+def _ensure_unique_index(cursor, index_name: str, table: str, column: str):
+    """Create a unique index on table(column), first dropping older duplicate rows
     
-    if existing:
-        conn.close()
-        return existing['id']
+    Only runs the cleanup when the index doesn't exist yet (i.e. once per database)
+    """
+    exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?",
+        (index_name,)
+    ).fetchone()
+    if exists:
+        return
     
-    # Create new user
-    cursor.execute(
-        "INSERT INTO users (clerk_user_id, email, name) VALUES (?, ?, ?)",
-        (clerk_user_id, email, name)
-    )
-    user_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    # Keep only the newest row per key (what the app already treated as "latest")
+    older_rows = f"""
+        SELECT id FROM (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY {column} ORDER BY created_at DESC, id DESC
+            ) AS rn
+            FROM {table}
+        ) WHERE rn > 1
+    """
+    if table == "classifications":
+        # Plans attached to dropped classifications would be unreachable
+        _archive_and_delete(cursor, "fitness_plans", f"classification_id IN ({older_rows})")
+    _archive_and_delete(cursor, table, f"id IN ({older_rows})")
+    cursor.execute(f"CREATE UNIQUE INDEX {index_name} ON {table}({column})")
+
+
+def _archive_and_delete(cursor, table: str, where: str):
+    """Move the rows matching where into {table}_archive (created on first use)
+    
+    Migrations that drop user data keep a copy instead of deleting it outright.
+    Foreign keys are off while migrating, so plan text in fitness_plan_bodies is
+    left in place for archived plans
+    """
+    count = cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE {where}").fetchone()[0]
+    if not count:
+        return
+    
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {table}_archive AS SELECT * FROM {table} WHERE 0")
+    cursor.execute(f"INSERT INTO {table}_archive SELECT * FROM {table} WHERE {where}")
+    cursor.execute(f"DELETE FROM {table} WHERE {where}")
+    logger.warning("⚠️ Moved %d older %s rows to %s_archive", count, table, table)
+
+
+def get_users_version() -> int:
+    """Get the users data version (changes whenever users, classifications or plans change)"""
+    with get_db_connection() as conn:
+        row = conn.execute(SQL_GET_USERS_VERSION).fetchone()
+    return row['value'] if row else 0
+
+
+def _create_user(cursor, clerk_user_id: str, email: str = None, name: str = None):
+    """Create or get user by Clerk ID using an open cursor (one statement either way)"""
+    # The no-op DO UPDATE makes RETURNING yield the existing row's id on conflict
+    return cursor.execute(SQL_UPSERT_USER, (clerk_user_id, email, name)).fetchone()['id']
+
+
+def _save_classification(cursor, user_id: int, body_type: str, gender: str):
+    """Save or update body type classification using an open cursor (one row per user)"""
+    classification_id = cursor.execute(
+        SQL_UPSERT_CLASSIFICATION, (user_id, body_type, gender)
+    ).fetchone()['id']
+    logger.debug("✅ Saved classification ID: %s", classification_id)
+    return classification_id
+
+
+def _save_plans(cursor, user_id: int, classification_id: int, workout_plan: str, meal_plan: str):
+    """Save or update fitness plans using an open cursor (one row per classification)"""
+    plan_id = cursor.execute(
+        SQL_UPSERT_PLAN, (user_id, classification_id)
+    ).fetchone()['id']
+    cursor.execute(SQL_UPSERT_PLAN_BODY, (plan_id, workout_plan, meal_plan))
+    logger.debug("✅ Saved plan ID: %s", plan_id)
+    return plan_id
+
+
+def create_user(clerk_user_id: str, email: str = None, name: str = None):
+    """Create or get user by Clerk ID"""
+    with get_db_connection() as conn, conn:
+        user_id = _create_user(conn.cursor(), clerk_user_id, email, name)
+    with _user_exists_lock:
+        _user_exists_cache[clerk_user_id] = True
     return user_id
 
 
 def save_classification(user_id: int, body_type: str, gender: str):
     """Save or update body type classification (updates latest if exists)"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Check if user has existing classification
-    cursor.execute(
-        """SELECT id FROM classifications 
-           WHERE user_id = ? 
-           ORDER BY created_at DESC 
-           LIMIT 1""",
-        (user_id,)
-    )
-    existing = cursor.fetchone()
-    
-    if existing:
-        # Update existing classification
-        classification_id = existing['id']
-        cursor.execute(
-            """UPDATE classifications 
-               SET body_type = ?, gender = ?, created_at = CURRENT_TIMESTAMP
-               WHERE id = ?""",
-            (body_type, gender, classification_id)
-        )
-        print(f"✅ Updated existing classification ID: {classification_id}")
-    else:
-        # Create new classification
-        cursor.execute(
-            """INSERT INTO classifications (user_id, body_type, gender)
-               VALUES (?, ?, ?)""",
-            (user_id, body_type, gender)
-        )
-        classification_id = cursor.lastrowid
-        print(f"✅ Created new classification ID: {classification_id}")
-    
-    conn.commit()
-    conn.close()
+    with get_db_connection() as conn, conn:
+        classification_id = _save_classification(conn.cursor(), user_id, body_type, gender)
     return classification_id
 
 
 def save_plans(user_id: int, classification_id: int, workout_plan: str, meal_plan: str):
     """Save or update fitness plans (updates latest if exists for this classification)"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Check if plan exists for this classification
-    cursor.execute(
-        """SELECT id FROM fitness_plans 
-           WHERE classification_id = ? 
-           ORDER BY created_at DESC 
-           LIMIT 1""",
-        (classification_id,)
-    )
-    existing = cursor.fetchone()
-    
-    if existing:
-        # Update existing plan
-        plan_id = existing['id']
-        cursor.execute(
-            """UPDATE fitness_plans 
-               SET workout_plan = ?, meal_plan = ?, created_at = CURRENT_TIMESTAMP
-               WHERE id = ?""",
-            (workout_plan, meal_plan, plan_id)
-        )
-        print(f"✅ Updated existing plan ID: {plan_id}")
-    else:
-        # Create new plan
-        cursor.execute(
-            """INSERT INTO fitness_plans 
-               (user_id, classification_id, workout_plan, meal_plan)
-               VALUES (?, ?, ?, ?)""",
-            (user_id, classification_id, workout_plan, meal_plan)
-        )
-        plan_id = cursor.lastrowid
-        print(f"✅ Created new plan ID: {plan_id}")
-    
-    conn.commit()
-    conn.close()
+    with get_db_connection() as conn, conn:
+        plan_id = _save_plans(conn.cursor(), user_id, classification_id, workout_plan, meal_plan)
     return plan_id
 
 
+def save_user_classification_and_plans(
+    clerk_user_id: str,
+    body_type: str,
+    gender: str,
+    workout_plan: str,
+    meal_plan: str,
+    email: str = None,
+    name: str = None
+):
+    """Create/get user, save classification and save plans in one transaction
+    
+    Returns (user_id, classification_id, plan_id)
+    """
+    # Inner "with conn" commits once on success and rolls back on any error
+    with get_db_connection() as conn, conn:
+        cursor = conn.cursor()
+        user_id = _create_user(cursor, clerk_user_id, email, name)
+        classification_id = _save_classification(cursor, user_id, body_type, gender)
+        plan_id = _save_plans(cursor, user_id, classification_id, workout_plan, meal_plan)
+    with _user_exists_lock:
+        _user_exists_cache[clerk_user_id] = True
+    return user_id, classification_id, plan_id
+
+
 def get_user_latest_plan(clerk_user_id: str):
     """Get user's latest fitness plan"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT 
-                f.id,
-                f.workout_plan,
-                f.meal_plan,
-                f.created_at,
-                c.body_type,
-                c.gender,
-                c.id as classification_id
-            FROM fitness_plans f
-            JOIN classifications c ON f.classification_id = c.id
-            JOIN users u ON f.user_id = u.id
-            WHERE u.clerk_user_id = ?
-            ORDER BY f.created_at DESC
-            LIMIT 1
-        """, (clerk_user_id,))
-        
-        result = cursor.fetchone()
-        conn.close()
+        with get_db_connection() as conn:
+            result = conn.execute(SQL_GET_USER_LATEST_PLAN, (clerk_user_id,)).fetchone()
         
         if result:
             return dict(result)
         return None
     except Exception as e:
-        print(f"❌ Database error in get_user_latest_plan: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Database error in get_user_latest_plan: %s", e)
         # Return None instead of raising - let endpoint handle it
         return None
 
 
 def get_user_classifications(clerk_user_id: str):
     """Get all user's classifications"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT 
-            c.id,
-            c.body_type,
-            c.gender,
-            c.created_at
-        FROM classifications c
-        JOIN users u ON c.user_id = u.id
-        WHERE u.clerk_user_id = ?
-        ORDER BY c.created_at DESC
-    """, (clerk_user_id,))
+    with get_db_connection() as conn:
+        rows = conn.execute(SQL_GET_USER_CLASSIFICATIONS, (clerk_user_id,)).fetchall()
     
-    results = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return results
+    return [dict(row) for row in rows]
 
 
 def user_exists(clerk_user_id: str):
-    """Check if user exists"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    """Check if user exists (answers are cached for USER_EXISTS_TTL_SECONDS)"""
+    with _user_exists_lock:
+        cached = _user_exists_cache.get(clerk_user_id)
+    if cached is not None:
+        return cached
     
-    cursor.execute(
-        "SELECT id FROM users WHERE clerk_user_id = ?",
-        (clerk_user_id,)
-    )
-    result = cursor.fetchone()
-    conn.close()
-    return result is not None
+    with get_db_connection() as conn:
+        result = conn.execute(SQL_GET_USER_ID_BY_CLERK_ID, (clerk_user_id,)).fetchone()
+    exists = result is not None
+    
+    with _user_exists_lock:
+        _user_exists_cache[clerk_user_id] = exists
+    return exists
 
 
 # Admin functions
 def get_all_users():
-    """Get all users with their latest classification and plan info"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    """Get all users with their latest classification and plan info (single query)
     
-    cursor.execute("""
-        SELECT 
-            u.id,
-            u.clerk_user_id,
-            u.email,
-            u.name,
-            u.created_at,
-            c.body_type,
-            c.gender,
-            c.created_at as classification_date,
-            f.workout_plan,
-            f.meal_plan,
-            f.created_at as plan_date
-        FROM users u
-        LEFT JOIN classifications c ON u.id = c.user_id AND c.id = (
-            SELECT id FROM classifications 
-            WHERE user_id = u.id 
-            ORDER BY created_at DESC 
-            LIMIT 1
-        )
-        LEFT JOIN fitness_plans f ON c.id = f.classification_id AND f.id = (
-            SELECT id FROM fitness_plans 
-            WHERE classification_id = c.id 
-            ORDER BY created_at DESC 
-            LIMIT 1
-        )
-        ORDER BY u.created_at DESC
-    """)
+    Plan text is not included; use get_user_latest_plan for a single user's plans
+    """
+    with get_db_connection() as conn:
+        # Rank classifications per user and plans per classification once,
+        # instead of running a correlated subquery for every user row
+        rows = conn.execute("""
+            WITH latest_classification AS (
+                SELECT 
+                    id,
+                    user_id,
+                    body_type,
+                    gender,
+                    created_at,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY user_id ORDER BY created_at DESC, id DESC
+                    ) AS rn
+                FROM classifications
+            ),
+            latest_plan AS (
+                SELECT 
+                    id,
+                    classification_id,
+                    created_at,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY classification_id ORDER BY created_at DESC, id DESC
+                    ) AS rn
+                FROM fitness_plans
+            )
+            SELECT 
+                u.id,
+                u.clerk_user_id,
+                u.email,
+                u.name,
+                u.created_at,
+                c.body_type,
+                c.gender,
+                c.created_at as classification_date,
+                f.id as plan_id,
+                f.id IS NOT NULL as has_plan,
+                f.created_at as plan_date
+            FROM users u
+            LEFT JOIN latest_classification c ON c.user_id = u.id AND c.rn = 1
+            LEFT JOIN latest_plan f ON f.classification_id = c.id AND f.rn = 1
+            ORDER BY u.created_at DESC
+        """).fetchall()
     
-    results = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return results
+    return [dict(row) for row in rows]
 
 
 def update_user(clerk_user_id: str, email: str = None, name: str = None):
     """Update user information"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     # Build update query dynamically
     updates = []
     params = []
@@ -316,52 +561,29 @@ def update_user(clerk_user_id: str, email: str = None, name: str = None):
         params.append(name)
     
     if not updates:
-        conn.close()
         return False
     
     params.append(clerk_user_id)
     query = f"UPDATE users SET {', '.join(updates)} WHERE clerk_user_id = ?"
     
-    cursor.execute(query, params)
-    conn.commit()
-    updated = cursor.rowcount > 0
-    conn.close()
+    with get_db_connection() as conn, conn:
+        cursor = conn.execute(query, params)
+        updated = cursor.rowcount > 0
     return updated
 
 
 def delete_user_from_db(clerk_user_id: str):
-    """Delete user and all related data from database"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    """Delete user and all related data from database
     
-    try:
-        # Get user_id first
-        cursor.execute("SELECT id FROM users WHERE clerk_user_id = ?", (clerk_user_id,))
-        user = cursor.fetchone()
-        
-        if not user:
-            conn.close()
-            return False
-        
-        user_id = user['id']
-        
-        # Delete in order (respecting foreign keys)
-        # 1. Delete fitness plans
-        cursor.execute("DELETE FROM fitness_plans WHERE user_id = ?", (user_id,))
-        
-        # 2. Delete classifications
-        cursor.execute("DELETE FROM classifications WHERE user_id = ?", (user_id,))
-        
-        # 3. Delete user
-        cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
-        
-        conn.commit()
-        deleted = cursor.rowcount > 0
-        conn.close()
-        return deleted
-    except Exception as e:
-        conn.rollback()
-        conn.close()
-        print(f"❌ Error deleting user: {str(e)}")
-        raise
-
+    Classifications and plans are removed by ON DELETE CASCADE in the same statement
+    """
+    with get_db_connection() as conn:
+        try:
+            with conn:
+                deleted = conn.execute(SQL_DELETE_USER, (clerk_user_id,)).fetchone()
+            with _user_exists_lock:
+                _user_exists_cache.pop(clerk_user_id, None)
+            return deleted is not None
+        except Exception as e:
+            logger.error("❌ Error deleting user: %s", e)
+            raise
@@ -0,0 +1,136 @@
+"""
+SQLite Connection Pool
+Reuses open connections across requests instead of connecting per call
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Optional
+
+
+class SQLitePool:
+    """Bounded pool of SQLite connections shared across threads"""
+
+    def __init__(
+        self,
+        db_path: Path,
+        pool_size: int = 20,
+        max_overflow: int = 10,
+        pool_timeout: float = 30.0,
+        pre_ping: bool = True,
+        on_connect: Optional[Callable[[sqlite3.Connection], None]] = None,
+        cached_statements: int = 256
+    ):
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_timeout = pool_timeout
+        self.pre_ping = pre_ping
+        self.on_connect = on_connect
+        self.cached_statements = cached_statements
+
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+        self._lock = threading.Lock()
+        self._checked_out = 0
+
+        # SQLite connections must not be used across fork (e.g. gunicorn --preload)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        """Drop connections inherited from the parent process (the parent keeps using them)"""
+        self._idle = queue.LifoQueue(maxsize=self.pool_size)
+        self._lock = threading.Lock()
+        self._checked_out = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a new connection usable from any threadpool worker"""
+        # Long-lived connections keep up to cached_statements compiled statements,
+        # so repeated queries skip SQL parsing and planning
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        conn.row_factory = sqlite3.Row  # Return dict-like rows
+        if self.on_connect is not None:
+            self.on_connect(conn)
+        return conn
+
+    def _is_alive(self, conn: sqlite3.Connection) -> bool:
+        """Cheap liveness check before handing a pooled connection out"""
+        try:
+            conn.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self) -> sqlite3.Connection:
+        """Check a connection out of the pool, opening one if capacity allows"""
+        with self._lock:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = None
+            if conn is None and self._checked_out < self.pool_size + self.max_overflow:
+                self._checked_out += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._checked_out -= 1
+                    raise
+            if conn is not None:
+                self._checked_out += 1
+
+        if conn is None:
+            # Pool exhausted: wait for another request to release a connection
+            try:
+                conn = self._idle.get(timeout=self.pool_timeout)
+            except queue.Empty:
+                raise TimeoutError(
+                    f"SQLite pool limit of {self.pool_size + self.max_overflow} reached, "
+                    f"timed out after {self.pool_timeout}s"
+                )
+            with self._lock:
+                self._checked_out += 1
+
+        if self.pre_ping and not self._is_alive(conn):
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+            conn = self._connect()
+        return conn
+
+    def release(self, conn: sqlite3.Connection):
+        """Return a connection to the pool (overflow connections are closed)"""
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            self._checked_out -= 1
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        """Context manager that acquires and always releases a connection"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        """Close every idle connection (used on shutdown)"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
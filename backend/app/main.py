@@ -3,28 +3,109 @@ FastAPI Application - Fitness App Backend
 """
 
 import os
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+import httpx
 from fastapi import FastAPI
+from openai import AsyncOpenAI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from app.services.rag_manager import get_diet_rag, get_exercise_rag
+from app.services.rag_manager import get_diet_rag, get_exercise_rag, warm_up_rag_systems, preload_rag_systems
 from app.api.v1 import rag as rag_router
 from app.api.v1 import agents as agents_router
+from app.api.v1.agents import create_supervisor, create_motivational_agent
 from app.api.v1 import classify as classify_router
 from app.api.v1 import users as users_router
 from app.api.v1 import admin as admin_router
 from app.api.v1 import admin_auth as admin_auth_router
-from app.database import init_database
+from app.api.v1.upload_limits import UploadSizeLimitMiddleware
+from app.database import init_database, db_pool
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Configure application logging once (LOG_LEVEL=DEBUG for verbose output, WARNING in production)
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
+logger = logging.getLogger(__name__)
+
 # Initialize database
 init_database()
 
+# Load RAG indexes and embedding models in the background at startup
+# (set PRELOAD_RAG=false on memory-constrained hosts to keep them lazy)
+PRELOAD_RAG = os.getenv("PRELOAD_RAG", "true").lower() == "true"
+
+# Under gunicorn --preload this module is imported once in the master before workers
+# fork; PRELOAD_RAG_BEFORE_FORK=true loads the RAG systems there so workers share them
+PRELOAD_RAG_BEFORE_FORK = os.getenv("PRELOAD_RAG_BEFORE_FORK", "false").lower() == "true"
+
+# Let the tokenizer use all cores while the embedding model warms up
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "true")
+
+if PRELOAD_RAG_BEFORE_FORK:
+    preload_rag_systems()
+    logger.info("✅ RAG systems preloaded before fork")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared resources on startup and release them on shutdown"""
+    # Shared HTTP client so outbound calls (Clerk API, OpenAI Vision) reuse keep-alive connections
+    # (generous default timeout for Vision; short calls pass their own timeout)
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        timeout=60.0,
+        # Sized for many concurrent classify calls multiplexed over HTTP/2 streams
+        limits=httpx.Limits(max_keepalive_connections=50, max_connections=200)
+    )
+    # OpenAI Vision client on the same pool, scoped to this app (None without an API key)
+    openai_key = os.getenv("OPENAI_API_KEY")
+    app.state.openai = AsyncOpenAI(api_key=openai_key, http_client=app.state.http) if openai_key else None
+    
+    # Build agents up front so the first request doesn't pay initialization cost
+    try:
+        app.state.supervisor = create_supervisor()
+        app.state.motivational = create_motivational_agent()
+        # Generate the common motivational sentences in the background
+        app.state.motivational.prefill()
+        logger.info("✅ Agents initialized at startup")
+    except Exception as e:
+        # e.g. OPENAI_API_KEY not set; agents are created on first use instead
+        app.state.supervisor = None
+        app.state.motivational = None
+        logger.warning("⚠️ Could not initialize agents at startup: %s", e)
+    
+    # Warm up RAG without delaying readiness; requests arriving first simply wait on the load lock
+    if PRELOAD_RAG:
+        app.state.rag_warmup = asyncio.create_task(asyncio.to_thread(warm_up_rag_systems))
+        app.state.rag_warmup.add_done_callback(_log_rag_warmup)
+    
+    try:
+        yield
+    finally:
+        await app.state.http.aclose()
+        db_pool.close_all()
+
+
+def _log_rag_warmup(task: asyncio.Task):
+    """Report the outcome of the background RAG warm-up"""
+    if task.cancelled():
+        return
+    if task.exception() is not None:
+        logger.warning("⚠️ RAG warm-up failed: %s", task.exception())
+    else:
+        logger.info("✅ RAG systems preloaded")
+
+
 app = FastAPI(
     title="Fitness App API",
     description="Backend API for Fitness App with RAG systems",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware - configure for production
@@ -45,6 +126,10 @@ if allowed_origins:
 # In production, add your Vercel URL to CORS_ORIGINS env var in Render
 # Example: CORS_ORIGINS=https://fitness-app-six-self.vercel.app,https://fitness-app-rajubholanis-projects.vercel.app,http://localhost:3000
 
+# Reject oversized uploads while the body streams in, before FastAPI parses the form
+# (added before CORS so CORS stays outermost and also decorates the 413 responses)
+app.add_middleware(UploadSizeLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins if "*" not in allowed_origins else ["*"],
@@ -56,10 +141,11 @@ app.add_middleware(
 # Lazy-loaded RAG systems are managed by rag_manager module
 # This prevents circular import issues and reduces startup memory
 
-# Create document folders
+# Create document and output folders
 from pathlib import Path
 Path("data/diet_documents").mkdir(parents=True, exist_ok=True)
 Path("data/exercise_documents").mkdir(parents=True, exist_ok=True)
+agents_router.RECOMMENDATIONS_DIR.mkdir(parents=True, exist_ok=True)
 
 # Include routers
 app.include_router(rag_router.router)
@@ -83,8 +169,9 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    diet = get_diet_rag()
-    exercise = get_exercise_rag()
+    # Resolve in a worker thread so a probe during warm-up doesn't block the event loop
+    diet = await asyncio.to_thread(get_diet_rag)
+    exercise = await asyncio.to_thread(get_exercise_rag)
     return {
         "status": "healthy",
         "diet_rag_documents": diet.get_document_count(),
@@ -4,9 +4,16 @@ Handles admin user authentication with username/password
 """
 
 import os
+import time
+import hashlib
+import threading
 from datetime import datetime, timedelta
 import bcrypt
-from jose import JWTError, jwt
+from argon2 import PasswordHasher
+from argon2.exceptions import VerifyMismatchError
+from cachetools import TTLCache
+import jwt
+from jwt import InvalidTokenError
 from typing import Optional
 from app.database import get_db_connection
 
@@ -15,96 +22,153 @@ SECRET_KEY = os.getenv("ADMIN_SECRET_KEY", "your-secret-key-change-in-production
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
 
+# Password hashing: argon2id for new hashes; legacy bcrypt hashes still verify
+# and are re-hashed with argon2id on the next successful login
+# The cost can be lowered for dev/CI (e.g. ARGON2_TIME_COST=1, ARGON2_MEMORY_COST=1024)
+# so scripted admin creation is fast; keep the defaults in production
+ARGON2_HASH_PREFIX = "$argon2"
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "2"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+_password_hasher = PasswordHasher(time_cost=ARGON2_TIME_COST, memory_cost=ARGON2_MEMORY_COST, parallelism=2)
+
+# Decoded JWT payloads, kept for up to the token lifetime so the signature is
+# checked once per token (entries are still rejected once their exp passes)
+_payload_cache = TTLCache(maxsize=4096, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+_payload_cache_lock = threading.Lock()
+
+# Hot-path SQL, kept as constants so the per-connection statement cache always hits
+SQL_GET_ADMIN_FOR_LOGIN = "SELECT id, username, password_hash FROM admin_users WHERE username = ?"
+SQL_GET_ADMIN_BY_USERNAME = "SELECT id, username, created_at, last_login FROM admin_users WHERE username = ?"
+SQL_GET_ADMIN_ID_BY_USERNAME = "SELECT id FROM admin_users WHERE username = ?"
+SQL_INSERT_ADMIN = "INSERT INTO admin_users (username, password_hash) VALUES (?, ?)"
+SQL_UPDATE_LAST_LOGIN = "UPDATE admin_users SET last_login = CURRENT_TIMESTAMP WHERE id = ?"
+SQL_UPDATE_PASSWORD_HASH = "UPDATE admin_users SET password_hash = ? WHERE id = ?"
+SQL_COUNT_ADMINS = "SELECT COUNT(*) as count FROM admin_users"
+
+# Short-lived cache of admin rows, keyed by username
+# Login still verifies the password against the cached hash but skips the SQL round-trip
+ADMIN_CACHE_TTL_SECONDS = 30
+_admin_login_cache = TTLCache(maxsize=1024, ttl=ADMIN_CACHE_TTL_SECONDS)
+_admin_cache = TTLCache(maxsize=1024, ttl=ADMIN_CACHE_TTL_SECONDS)
+_admin_cache_lock = threading.Lock()
+
+# Cached admin account count for health checks (invalidated when an admin is created)
+ADMIN_COUNT_TTL_SECONDS = 10
+_admin_count_cache = {"value": None, "ts": 0.0}
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash"""
+    """Verify a password against its hash (argon2id or legacy bcrypt)"""
     try:
-        # Encode strings to bytes
+        if hashed_password.startswith(ARGON2_HASH_PREFIX):
+            return _password_hasher.verify(hashed_password, plain_password)
+        
+        # Legacy bcrypt hash: encode strings to bytes
         password_bytes = plain_password.encode('utf-8')
         hash_bytes = hashed_password.encode('utf-8')
         return bcrypt.checkpw(password_bytes, hash_bytes)
+    except VerifyMismatchError:
+        return False
     except Exception as e:
         print(f"❌ Error verifying password: {str(e)}")
         return False
 
 
 def get_password_hash(password: str) -> str:
-    """Hash a password"""
-    # Encode password to bytes
-    password_bytes = password.encode('utf-8')
-    # Generate salt and hash
-    salt = bcrypt.gensalt(rounds=12)
-    hashed = bcrypt.hashpw(password_bytes, salt)
-    # Return as string
-    return hashed.decode('utf-8')
+    """Hash a password with argon2id"""
+    return _password_hasher.hash(password)
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Check if a stored hash is legacy bcrypt or uses outdated argon2 parameters"""
+    if not hashed_password.startswith(ARGON2_HASH_PREFIX):
+        return True
+    return _password_hasher.check_needs_rehash(hashed_password)
 
 
 def create_admin_user(username: str, password: str) -> bool:
     """Create a new admin user"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    # Hash before taking a connection so the slow hashing work doesn't hold one
+    password_hash = get_password_hash(password)
     
     try:
-        # Check if username already exists
-        cursor.execute(
-            "SELECT id FROM admin_users WHERE username = ?",
-            (username,)
-        )
-        if cursor.fetchone():
-            conn.close()
-            return False
-        
-        # Hash password and create user
-        password_hash = get_password_hash(password)
-        cursor.execute(
-            "INSERT INTO admin_users (username, password_hash) VALUES (?, ?)",
-            (username, password_hash)
-        )
-        conn.commit()
-        conn.close()
-        return True
+        with get_db_connection() as conn, conn:
+            # Check if username already exists
+            if conn.execute(SQL_GET_ADMIN_ID_BY_USERNAME, (username,)).fetchone():
+                return False
+            
+            # Create user
+            conn.execute(SQL_INSERT_ADMIN, (username, password_hash))
     except Exception as e:
-        conn.rollback()
-        conn.close()
         print(f"❌ Error creating admin user: {str(e)}")
         return False
+    
+    _admin_count_cache["value"] = None
+    _invalidate_admin_cache(username)
+    return True
+
+
+def _invalidate_admin_cache(username: str):
+    """Drop cached rows for an admin after it changes"""
+    with _admin_cache_lock:
+        _admin_login_cache.pop(username, None)
+        _admin_cache.pop(username, None)
+
+
+def get_admin_count() -> int:
+    """Get number of admin accounts, cached for a few seconds (for health probes)"""
+    now = time.monotonic()
+    if _admin_count_cache["value"] is not None and now - _admin_count_cache["ts"] < ADMIN_COUNT_TTL_SECONDS:
+        return _admin_count_cache["value"]
+    
+    with get_db_connection() as conn:
+        admin_count = conn.execute(SQL_COUNT_ADMINS).fetchone()['count']
+    
+    _admin_count_cache["value"] = admin_count
+    _admin_count_cache["ts"] = now
+    return admin_count
 
 
 def authenticate_admin(username: str, password: str) -> Optional[dict]:
     """Authenticate admin user and return user info"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     try:
-        cursor.execute(
-            "SELECT id, username, password_hash FROM admin_users WHERE username = ?",
-            (username,)
-        )
-        user = cursor.fetchone()
+        with _admin_cache_lock:
+            user = _admin_login_cache.get(username)
         
-        if not user:
-            conn.close()
-            return None
+        if user is None:
+            with get_db_connection() as conn:
+                row = conn.execute(SQL_GET_ADMIN_FOR_LOGIN, (username,)).fetchone()
+            
+            if not row:
+                return None
+            
+            user = (row['id'], row['username'], row['password_hash'])
+            with _admin_cache_lock:
+                _admin_login_cache[username] = user
+        
+        admin_id, admin_username, password_hash = user
         
-        # Verify password
-        if not verify_password(password, user['password_hash']):
-            conn.close()
+        # Verify password (connection already released; hashing is slow)
+        if not verify_password(password, password_hash):
             return None
         
-        # Update last login
-        cursor.execute(
-            "UPDATE admin_users SET last_login = CURRENT_TIMESTAMP WHERE id = ?",
-            (user['id'],)
-        )
-        conn.commit()
-        conn.close()
+        # Upgrade legacy bcrypt hashes now that we have the plain password
+        new_hash = get_password_hash(password) if password_needs_rehash(password_hash) else None
+        
+        # Update last login (and the re-hashed password, if any)
+        with get_db_connection() as conn, conn:
+            conn.execute(SQL_UPDATE_LAST_LOGIN, (admin_id,))
+            if new_hash is not None:
+                conn.execute(SQL_UPDATE_PASSWORD_HASH, (new_hash, admin_id))
+        
+        # last_login (and maybe the hash) changed, so the cached rows are stale
+        _invalidate_admin_cache(username)
         
         return {
-            "id": user['id'],
-            "username": user['username']
+            "id": admin_id,
+            "username": admin_username
         }
     except Exception as e:
-        conn.close()
         print(f"❌ Error authenticating admin: {str(e)}")
         return None
 
@@ -123,32 +187,65 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 
 def verify_token(token: str) -> Optional[dict]:
-    """Verify JWT token and return payload"""
+    """Verify JWT token and return payload (decoded payloads are cached until exp)"""
+    key = hashlib.sha256(token.encode('utf-8')).digest()
+    
+    with _payload_cache_lock:
+        payload = _payload_cache.get(key)
+    if payload is not None:
+        if payload.get("exp", 0) > time.time():
+            return payload
+        with _payload_cache_lock:
+            _payload_cache.pop(key, None)
+        return None
+    
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
-    except JWTError:
+    except InvalidTokenError:
         return None
+    
+    with _payload_cache_lock:
+        _payload_cache[key] = payload
+    return payload
+
+
+def verify_admin_token(token: str) -> Optional[dict]:
+    """
+    Verify JWT token and resolve its admin user
+    
+    The decoded payload and the admin row are each cached; callers that need the
+    whole principal cached (admin API) do that themselves
+    
+    Returns:
+        {"payload": ..., "admin": ...} (admin is None if the user no longer exists),
+        or None if the token is invalid or expired
+    """
+    payload = verify_token(token)
+    if payload is None:
+        return None
+    
+    username = payload.get("sub")
+    admin = get_admin_by_username(username) if username else None
+    return {"payload": payload, "admin": admin, "exp": payload.get("exp", 0)}
 
 
 def get_admin_by_username(username: str) -> Optional[dict]:
-    """Get admin user by username"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    """Get admin user by username (found rows are cached for ADMIN_CACHE_TTL_SECONDS)"""
+    with _admin_cache_lock:
+        cached = _admin_cache.get(username)
+    if cached is not None:
+        return dict(cached)
     
     try:
-        cursor.execute(
-            "SELECT id, username, created_at, last_login FROM admin_users WHERE username = ?",
-            (username,)
-        )
-        user = cursor.fetchone()
-        conn.close()
+        with get_db_connection() as conn:
+            user = conn.execute(SQL_GET_ADMIN_BY_USERNAME, (username,)).fetchone()
         
         if user:
-            return dict(user)
+            admin = dict(user)
+            with _admin_cache_lock:
+                _admin_cache[username] = admin
+            return dict(admin)
         return None
     except Exception as e:
-        conn.close()
         print(f"❌ Error getting admin user: {str(e)}")
         return None
-
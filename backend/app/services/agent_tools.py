@@ -3,13 +3,97 @@ Agent Tools for LangGraph
 Tools that agents can use to search the web and RAG systems
 """
 
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict
+from cachetools import TTLCache
 from langchain_core.tools import tool
 from app.services.web_search_tool import web_search_tool
 from app.services.rag_manager import get_diet_rag, get_exercise_rag
 
 # Use lazy-loaded RAG systems (reduces startup memory)
 
+# Max web searches issued at once by the batch web tools
+WEB_SEARCH_CONCURRENCY = 4
+
+# RAG results are cached per (source, normalized query, k) so refinement
+# iterations reuse earlier searches (web results are cached by WebSearchTool).
+# Entries are dropped by bust_rag_cache() whenever documents are ingested or cleared
+TOOL_CACHE_TTL_SECONDS = 300
+_rag_cache = TTLCache(maxsize=1024, ttl=TOOL_CACHE_TTL_SECONDS)
+_tool_cache_lock = threading.Lock()
+
+
+def _cache_key(source: str, query: str, k: int) -> tuple:
+    """Cache key for a search (queries differing only in case/whitespace share it)"""
+    return (source, query.lower().strip(), k)
+
+
+def bust_rag_cache():
+    """Drop cached RAG search results (call after documents are ingested or cleared)"""
+    with _tool_cache_lock:
+        _rag_cache.clear()
+
+
+def _search_rag(source: str, rag, queries: List[str], k: int) -> List[List[Dict]]:
+    """Search a RAG system for several queries, embedding only the uncached ones"""
+    keys = [_cache_key(source, query, k) for query in queries]
+    with _tool_cache_lock:
+        results = [_rag_cache.get(key) for key in keys]
+    
+    misses = [i for i, result in enumerate(results) if result is None]
+    if misses:
+        fresh = rag.search_batch([queries[i] for i in misses], k)
+        with _tool_cache_lock:
+            for i, result in zip(misses, fresh):
+                _rag_cache[keys[i]] = result
+                results[i] = result
+    return results
+
+
+def _format_rag_results(results: List[Dict], empty_message: str) -> str:
+    """Format RAG search hits for the agent"""
+    if not results:
+        return empty_message
+    
+    formatted_results = []
+    for i, result in enumerate(results, 1):
+        formatted_results.append(
+            f"Result {i} (Relevance: {result['relevance_score']:.2f}):\n"
+            f"{result['content']}\n"
+        )
+    
+    return "\n---\n".join(formatted_results)
+
+
+def _format_web_results(results: List[Dict], empty_message: str) -> str:
+    """Format web search results for the agent"""
+    if not results:
+        return empty_message
+    
+    formatted_results = []
+    for i, result in enumerate(results, 1):
+        formatted_results.append(
+            f"Source {i}: {result['title']}\n"
+            f"URL: {result['url']}\n"
+            f"Summary: {result['snippet']}\n"
+        )
+    
+    return "\n---\n".join(formatted_results)
+
+
+def _format_batch(queries: List[str], formatted: List[str]) -> str:
+    """Label each query's formatted results in a batched tool response"""
+    return "\n\n".join(
+        f"=== Query: {query} ===\n{result}" for query, result in zip(queries, formatted)
+    )
+
+
+def _search_web_concurrently(search, queries: List[str], max_results: int) -> List[List[Dict]]:
+    """Run web searches for several queries in parallel threads"""
+    with ThreadPoolExecutor(max_workers=min(WEB_SEARCH_CONCURRENCY, len(queries))) as executor:
+        return list(executor.map(lambda q: search(q, max_results), queries))
+
 
 @tool
 def search_diet_rag(query: str, k: int = 3) -> str:
@@ -24,19 +108,8 @@ def search_diet_rag(query: str, k: int = 3) -> str:
         Formatted string with relevant information from diet documents
     """
     diet_rag = get_diet_rag()
-    results = diet_rag.search(query, k)
-    
-    if not results:
-        return "No relevant information found in diet documents."
-    
-    formatted_results = []
-    for i, result in enumerate(results, 1):
-        formatted_results.append(
-            f"Result {i} (Relevance: {result['relevance_score']:.2f}):\n"
-            f"{result['content']}\n"
-        )
-    
-    return "\n---\n".join(formatted_results)
+    results = _search_rag("diet", diet_rag, [query], k)[0]
+    return _format_rag_results(results, "No relevant information found in diet documents.")
 
 
 @tool
@@ -52,19 +125,8 @@ def search_exercise_rag(query: str, k: int = 3) -> str:
         Formatted string with relevant information from exercise documents
     """
     exercise_rag = get_exercise_rag()
-    results = exercise_rag.search(query, k)
-    
-    if not results:
-        return "No relevant information found in exercise documents."
-    
-    formatted_results = []
-    for i, result in enumerate(results, 1):
-        formatted_results.append(
-            f"Result {i} (Relevance: {result['relevance_score']:.2f}):\n"
-            f"{result['content']}\n"
-        )
-    
-    return "\n---\n".join(formatted_results)
+    results = _search_rag("exercise", exercise_rag, [query], k)[0]
+    return _format_rag_results(results, "No relevant information found in exercise documents.")
 
 
 @tool
@@ -80,19 +142,7 @@ def search_web_diet(query: str, max_results: int = 3) -> str:
         Formatted string with current web search results about diet/nutrition
     """
     results = web_search_tool.search_diet(query, max_results)
-    
-    if not results:
-        return "No web results found for diet query."
-    
-    formatted_results = []
-    for i, result in enumerate(results, 1):
-        formatted_results.append(
-            f"Source {i}: {result['title']}\n"
-            f"URL: {result['url']}\n"
-            f"Summary: {result['snippet']}\n"
-        )
-    
-    return "\n---\n".join(formatted_results)
+    return _format_web_results(results, "No web results found for diet query.")
 
 
 @tool
@@ -108,19 +158,97 @@ def search_web_exercise(query: str, max_results: int = 3) -> str:
         Formatted string with current web search results about exercise/workouts
     """
     results = web_search_tool.search_exercise(query, max_results)
+    return _format_web_results(results, "No web results found for exercise query.")
+
+
+@tool
+def search_diet_rag_batch(queries: List[str], k: int = 3) -> str:
+    """
+    Search diet/nutrition documents for several queries in one call.
     
-    if not results:
-        return "No web results found for exercise query."
+    Prefer this over repeated search_diet_rag calls when you have more than one question.
     
-    formatted_results = []
-    for i, result in enumerate(results, 1):
-        formatted_results.append(
-            f"Source {i}: {result['title']}\n"
-            f"URL: {result['url']}\n"
-            f"Summary: {result['snippet']}\n"
-        )
+    Args:
+        queries: Search queries about diet, nutrition, meal plans, etc.
+        k: Number of results to return per query (default: 3)
+        
+    Returns:
+        Formatted string with relevant information for each query
+    """
+    diet_rag = get_diet_rag()
+    batch_results = _search_rag("diet", diet_rag, queries, k)
+    return _format_batch(queries, [
+        _format_rag_results(results, "No relevant information found in diet documents.")
+        for results in batch_results
+    ])
+
+
+@tool
+def search_exercise_rag_batch(queries: List[str], k: int = 3) -> str:
+    """
+    Search exercise/workout documents for several queries in one call.
     
-    return "\n---\n".join(formatted_results)
+    Prefer this over repeated search_exercise_rag calls when you have more than one question.
+    
+    Args:
+        queries: Search queries about exercises, workout routines, training, etc.
+        k: Number of results to return per query (default: 3)
+        
+    Returns:
+        Formatted string with relevant information for each query
+    """
+    exercise_rag = get_exercise_rag()
+    batch_results = _search_rag("exercise", exercise_rag, queries, k)
+    return _format_batch(queries, [
+        _format_rag_results(results, "No relevant information found in exercise documents.")
+        for results in batch_results
+    ])
+
+
+@tool
+def search_web_diet_batch(queries: List[str], max_results: int = 3) -> str:
+    """
+    Search the web for several diet/nutrition queries in one call (run in parallel).
+    
+    Prefer this over repeated search_web_diet calls when you have more than one question.
+    
+    Args:
+        queries: Search queries about diet, nutrition, health, etc.
+        max_results: Maximum number of results per query (default: 3)
+        
+    Returns:
+        Formatted string with web search results for each query
+    """
+    if not queries:
+        return "No queries provided."
+    batch_results = _search_web_concurrently(web_search_tool.search_diet, queries, max_results)
+    return _format_batch(queries, [
+        _format_web_results(results, "No web results found for diet query.")
+        for results in batch_results
+    ])
+
+
+@tool
+def search_web_exercise_batch(queries: List[str], max_results: int = 3) -> str:
+    """
+    Search the web for several exercise/workout queries in one call (run in parallel).
+    
+    Prefer this over repeated search_web_exercise calls when you have more than one question.
+    
+    Args:
+        queries: Search queries about exercises, workouts, fitness, training, etc.
+        max_results: Maximum number of results per query (default: 3)
+        
+    Returns:
+        Formatted string with web search results for each query
+    """
+    if not queries:
+        return "No queries provided."
+    batch_results = _search_web_concurrently(web_search_tool.search_exercise, queries, max_results)
+    return _format_batch(queries, [
+        _format_web_results(results, "No web results found for exercise query.")
+        for results in batch_results
+    ])
 
 
 # List of all available tools
@@ -129,6 +257,10 @@ AGENT_TOOLS = [
     search_exercise_rag,
     search_web_diet,
     search_web_exercise,
+    search_diet_rag_batch,
+    search_exercise_rag_batch,
+    search_web_diet_batch,
+    search_web_exercise_batch,
 ]
 
 
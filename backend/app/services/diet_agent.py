@@ -3,21 +3,77 @@ Diet Agent
 Responsible for generating diet/nutrition recommendations
 """
 
-from typing import Dict
+from typing import AsyncIterator, Dict, List
+from langchain_core.messages import AIMessageChunk
 from langchain_openai import ChatOpenAI
 from langgraph.prebuilt import create_react_agent
-from app.services.agent_tools import search_diet_rag, search_web_diet
+from app.services.agent_tools import (
+    search_diet_rag,
+    search_web_diet,
+    search_diet_rag_batch,
+    search_web_diet_batch,
+)
 from app.services.agent_state import AgentState
 
 
+# Static instructions, sent as the system message; kept byte-identical across
+# calls so the constant prefix is served from the provider's prompt cache
+DIET_SYSTEM_PROMPT = """You are an expert nutritionist and dietitian.
+
+Generate a comprehensive 4-week diet plan for the body type and goals given by the user.
+
+Your plan should include:
+1. Meal plan structure for 28 days
+2. Daily macronutrient targets (protein, carbs, fats)
+3. Meal timing and frequency recommendations
+4. Specific food recommendations tailored to the user's body type
+5. Hydration guidelines
+6. Supplement suggestions (if applicable)
+
+Use the search tools available to find relevant information:
+- search_diet_rag_batch: Search uploaded diet/nutrition documents for a list of queries
+- search_web_diet_batch: Search current web information for a list of queries
+- search_diet_rag: Search uploaded diet/nutrition documents
+- search_web_diet: Search current web information about diet/nutrition
+
+Batch your searches: put all the questions you have into one search_diet_rag_batch
+and one search_web_diet_batch call per step instead of calling the single-query tools repeatedly.
+
+Provide detailed, actionable recommendations.
+Format your response as a comprehensive meal plan that can be followed for 4 weeks.
+"""
+
+
 class DietAgent:
     """Agent for diet and nutrition recommendations"""
     
     def __init__(self, llm: ChatOpenAI):
         self.llm = llm
-        self.tools = [search_diet_rag, search_web_diet]
+        self.tools = [search_diet_rag_batch, search_web_diet_batch, search_diet_rag, search_web_diet]
         self.agent = create_react_agent(llm, self.tools)
     
+    def _build_messages(self, state: Dict) -> List[Dict]:
+        """Build the agent messages from the current state
+        
+        Only the short user message varies; the system prompt is identical on every
+        call, so the provider's prompt prefix cache can reuse it across iterations
+        """
+        body_type = state.get('body_type', 'unknown')
+        goals = state.get('goals', 'general fitness')
+        iteration = state.get('current_iteration', 0)
+        
+        return [
+            {"role": "system", "content": DIET_SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": (
+                    f"Body type: {body_type}\n"
+                    f"Goals: {goals}\n"
+                    f"This is iteration {iteration + 1} of refinement."
+                )
+            }
+        ]
+    
     def generate_recommendation(self, state: Dict) -> str:
         """
         Generate diet recommendation based on body type and goals
@@ -28,35 +84,10 @@ class DietAgent:
         Returns:
             Diet recommendation string
         """
-        body_type = state.get('body_type', 'unknown')
-        goals = state.get('goals', 'general fitness')
-        iteration = state.get('current_iteration', 0)
-        
-        # Construct prompt for the agent
-        prompt = f"""You are an expert nutritionist and dietitian. 
-
-Generate a comprehensive 4-week diet plan for a {body_type} with the following goals: {goals}
-
-Your plan should include:
-1. Meal plan structure for 28 days
-2. Daily macronutrient targets (protein, carbs, fats)
-3. Meal timing and frequency recommendations
-4. Specific food recommendations tailored to {body_type} body type
-5. Hydration guidelines
-6. Supplement suggestions (if applicable)
-
-Use the search tools available to find relevant information:
-- search_diet_rag: Search uploaded diet/nutrition documents
-- search_web_diet: Search current web information about diet/nutrition
-
-This is iteration {iteration + 1} of refinement. Provide detailed, actionable recommendations.
-Format your response as a comprehensive meal plan that can be followed for 4 weeks.
-"""
+        messages = self._build_messages(state)
         
         # Call the agent
-        response = self.agent.invoke({
-            "messages": [{"role": "user", "content": prompt}]
-        })
+        response = self.agent.invoke({"messages": messages})
         
         # Extract content from the last message
         if response.get('messages'):
@@ -67,4 +98,25 @@ Format your response as a comprehensive meal plan that can be followed for 4 wee
                 return last_message['content']
         
         return "Diet recommendation could not be generated."
-
+    
+    async def astream_recommendation(self, state: Dict) -> AsyncIterator[str]:
+        """
+        Stream diet recommendation text as the LLM generates it
+        
+        Args:
+            state: Current agent state
+            
+        Yields:
+            Text deltas of the agent's answer (tool calls are not yielded)
+        """
+        messages = self._build_messages(state)
+        
+        async for chunk, metadata in self.agent.astream(
+            {"messages": messages},
+            stream_mode="messages"
+        ):
+            # Only forward tokens produced by the LLM node, not tool outputs
+            if metadata.get("langgraph_node") != "agent":
+                continue
+            if isinstance(chunk, AIMessageChunk) and isinstance(chunk.content, str) and chunk.content:
+                yield chunk.content
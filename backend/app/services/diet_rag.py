@@ -4,12 +4,30 @@ Retrieval Augmented Generation for Diet/Nutrition documents
 """
 
 import os
-from typing import List, Optional
+import threading
+from typing import Iterable, Iterator, List, Optional
 from pathlib import Path
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from app.services.document_processor import DocumentProcessor
+from app.services.document_store import DocumentStore
+from app.services.embedding_model import embed_queries, get_embedding_model
+from app.services.query_cache import SemanticQueryCache
+
+# HNSW graph parameters: links per node, build-time and query-time beam widths
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 40
+HNSW_EF_SEARCH = 64
+
+# Chunks embedded per forward pass when adding documents
+EMBED_BATCH_SIZE = 64
+
+# While processing a folder, files are embedded in groups of N and the index is saved after each group
+INDEX_SNAPSHOT_EVERY = 10
+
+# Below this many vectors, search is an exact numpy matmul over all embeddings,
+# which beats the per-call overhead of the HNSW graph search
+EXACT_SEARCH_MAX_VECTORS = 2048
 
 
 class DietRAG:
@@ -19,99 +37,221 @@ class DietRAG:
         self.persist_directory = Path(persist_directory)
         self.persist_directory.mkdir(parents=True, exist_ok=True)
         
-        # Lazy load embeddings model to reduce startup memory usage
-        # Model loads only when first needed (saves ~150MB at startup)
-        self.embedding_model = None  # Will be loaded on first use
+        # Embedding model is shared and lazy-loaded (see embedding_model.py)
         self.dimension = 384  # dimension of the embedding model
         
-        # FAISS index
+        # FAISS index; chunk texts live in an SQLite store keyed by vector id
         self.index = None
-        self.documents = []
         self.index_path = self.persist_directory / "index.faiss"
+        # Copy of all embeddings (rows aligned with vector ids) while the index is small
+        self._emb_matrix = None
+        # Set when the in-memory index has changes not yet written to index_path
+        self._dirty = False
+        self.store = DocumentStore(self.persist_directory / "documents.db")
+        
+        # Near-duplicate queries (e.g. across agent refinement iterations) reuse earlier results
+        self.query_cache = SemanticQueryCache(self.dimension)
+        self.processed_files = set()
+        
+        # Plain-text files written by older versions (imported into the store once)
         self.docs_path = self.persist_directory / "documents.txt"
         self.processed_files_path = self.persist_directory / "processed_files.txt"
-        self.processed_files = []
+        self.content_hashes_path = self.persist_directory / "content_hashes.txt"
+        self.store.import_legacy_files(self.docs_path, self.processed_files_path, self.content_hashes_path)
+        self.content_hashes = set()
         
         # Load processed files list
         self._load_processed_files()
         
+        # Load hashes of ingested uploads (used to skip duplicate uploads)
+        self._load_content_hashes()
+        
         # Load existing index if it exists
         self._load_index()
         
         # Document processor
         self.processor = DocumentProcessor()
+        
+        # Guards the index, documents and processed files when files are added concurrently
+        # (writers hold it for the whole add, including embedding, so there is one writer at a time)
+        self._lock = threading.Lock()
+        # Held briefly around faiss add/search and index swaps: HNSW isn't safe to
+        # search while vectors are being added, and searches shouldn't wait on embedding
+        self._index_lock = threading.Lock()
+        # Guards content_hashes and the hashes of uploads still being ingested; never held
+        # while embedding, so the duplicate check is cheap enough for the event loop
+        self._hash_lock = threading.Lock()
+        self._pending_hashes = set()
     
     def _get_embedding_model(self):
         """Lazy load embedding model only when needed (reduces startup memory)"""
-        if self.embedding_model is None:
-            print("Loading embedding model (this may take a moment on first use)...")
-            self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-            print("Embedding model loaded successfully")
-        return self.embedding_model
+        return get_embedding_model()
     
     def _load_index(self):
         """Load existing FAISS index if it exists"""
         try:
             if self.index_path.exists():
                 self.index = faiss.read_index(str(self.index_path))
-                if self.docs_path.exists():
-                    with open(self.docs_path, 'r', encoding='utf-8') as f:
-                        self.documents = [line.strip() for line in f.readlines()]
-                print(f"Loaded existing Diet RAG index with {len(self.documents)} documents")
+                if (not isinstance(self.index, faiss.IndexHNSWSQ)
+                        or self.index.metric_type != faiss.METRIC_INNER_PRODUCT):
+                    # Indexes saved by older versions (flat / float32 / L2): rebuild from the stored vectors
+                    vectors = np.ascontiguousarray(self.index.reconstruct_n(0, self.index.ntotal), dtype=np.float32)
+                    faiss.normalize_L2(vectors)
+                    self.index = self._new_index()
+                    self.index.add(vectors)
+                    self._dirty = True
+                    self._save_index()
+                else:
+                    self.index.hnsw.efSearch = HNSW_EF_SEARCH
+                if self.index.ntotal <= EXACT_SEARCH_MAX_VECTORS:
+                    self._emb_matrix = self.index.reconstruct_n(0, self.index.ntotal)
+                print(f"Loaded existing Diet RAG index with {self.index.ntotal} documents")
         except Exception as e:
             print(f"Could not load existing index: {e}")
     
+    def _new_index(self):
+        """Create an empty HNSW index over 8-bit scalar-quantized vectors
+        
+        Approximate, sub-linear search instead of a full scan; int8 storage is
+        4x smaller than float32 and uses the SIMD int8 distance kernels
+        """
+        # Inner product on unit vectors is cosine similarity (no sqrt/subtract per comparison)
+        index = faiss.IndexHNSWSQ(
+            self.dimension, faiss.ScalarQuantizer.QT_8bit, HNSW_M, faiss.METRIC_INNER_PRODUCT
+        )
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+        # Embeddings are unit-normalized, so every component lies in [-1, 1];
+        # training on those bounds fixes the quantizer ranges up front
+        bounds = np.array([[-1.0] * self.dimension, [1.0] * self.dimension], dtype=np.float32)
+        index.train(bounds)
+        return index
+    
     def _save_index(self):
-        """Save FAISS index and documents"""
-        if self.index is not None:
-            faiss.write_index(self.index, str(self.index_path))
-            with open(self.docs_path, 'w', encoding='utf-8') as f:
-                f.write('\n'.join(self.documents))
+        """Save FAISS index if it changed (chunk texts are already persisted in the store)
+        
+        Written to a temp file and swapped in, so a crash never leaves a torn index
+        """
+        if self.index is not None and self._dirty:
+            tmp_path = self.index_path.with_suffix(".faiss.tmp")
+            faiss.write_index(self.index, str(tmp_path))
+            os.replace(tmp_path, self.index_path)
+            self._dirty = False
     
     def _load_processed_files(self):
-        """Load list of processed files"""
+        """Load the set of processed file names"""
         try:
-            if self.processed_files_path.exists():
-                with open(self.processed_files_path, 'r', encoding='utf-8') as f:
-                    self.processed_files = [line.strip() for line in f.readlines()]
+            self.processed_files = set(self.store.get_processed_files())
         except Exception as e:
             print(f"Could not load processed files list: {e}")
     
-    def _save_processed_files(self):
-        """Save list of processed files"""
-        with open(self.processed_files_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(self.processed_files))
-    
-    def add_document(self, file_path: str) -> bool:
-        """Add a document to the diet RAG system"""
+    def _load_content_hashes(self):
+        """Load content hashes of already ingested documents"""
         try:
-            # Process document
-            chunks = self.processor.process_document(file_path)
-            
-            # Initialize index if needed
-            if self.index is None:
-                self.index = faiss.IndexFlatL2(self.dimension)
+            self.content_hashes = set(self.store.get_content_hashes())
+        except Exception as e:
+            print(f"Could not load content hashes: {e}")
+    
+    def claim_document(self, content_hash: str) -> bool:
+        """Reserve a content hash for ingestion, or return False if that content was
+        already ingested (or is being ingested by another request)
+        
+        Check and reservation are atomic; add_document(..., content_hash) must follow
+        and releases the claim whether or not it succeeds
+        """
+        with self._hash_lock:
+            if content_hash in self.content_hashes or content_hash in self._pending_hashes:
+                return False
+            self._pending_hashes.add(content_hash)
+            return True
+    
+    def _add_chunks(self, file_path: str, chunks: list, save_index: bool = True, content_hash: Optional[str] = None):
+        """Embed chunks and append them to the index (caller must hold self._lock)"""
+        self._add_file_batch([(file_path, chunks)], save_index, [content_hash] if content_hash else [])
+    
+    def _add_file_batch(self, batch: list, save_index: bool = True, content_hashes: Iterable[str] = ()):
+        """Embed the chunks of several (file_path, chunks) pairs in one pass and
+        append them to the index (caller must hold self._lock)
+        
+        content_hashes of uploaded documents are stored together with the chunk texts
+        """
+        # Initialize index if needed
+        if self.index is None:
+            self.index = self._new_index()
+        
+        # Embed all chunks in one batched call (sentence-transformers already
+        # sorts by length internally to minimize padding)
+        texts = [chunk.page_content for _, chunks in batch for chunk in chunks]
+        if texts:
+            embeddings = self._get_embedding_model().encode(
+                texts,
+                batch_size=EMBED_BATCH_SIZE,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            )
             
-            # Add chunks to vector store
-            for chunk in chunks:
-                # Create embedding (lazy loads model if needed)
-                embedding = self._get_embedding_model().encode(chunk.page_content)
-                embedding = np.array([embedding], dtype=np.float32)
-                
-                # Add to FAISS index
-                self.index.add(embedding)
-                
-                # Store document text
-                self.documents.append(chunk.page_content)
+            # Add to FAISS index in one call; texts are stored under the new vector ids
+            start_id = self.index.ntotal
+            embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+            with self._index_lock:
+                self.index.add(embeddings)
+                self._extend_emb_matrix(start_id, embeddings)
+            self._dirty = True
+            self.store.add_texts(start_id, texts, content_hashes)
             
-            # Track processed file
+            # New documents can change any query's results
+            self.query_cache.clear()
+        elif content_hashes:
+            self.store.add_texts(self.index.ntotal, [], content_hashes)
+        with self._hash_lock:
+            self.content_hashes.update(content_hashes)
+        
+        # Track processed files
+        for file_path, _ in batch:
             file_name = Path(file_path).name
             if file_name not in self.processed_files:
-                self.processed_files.append(file_name)
-                self._save_processed_files()
-            
-            # Save index
+                self.processed_files.add(file_name)
+                self.store.add_processed_file(file_name)
+        
+        # Save index (bulk callers save once at the end instead)
+        if save_index:
             self._save_index()
+    
+    def _extend_emb_matrix(self, start_id: int, embeddings: np.ndarray):
+        """Keep the exact-search matrix in step with the index, dropping it once the index outgrows it"""
+        if self.index.ntotal > EXACT_SEARCH_MAX_VECTORS:
+            self._emb_matrix = None
+        elif start_id == 0:
+            self._emb_matrix = embeddings
+        elif self._emb_matrix is not None:
+            # Build a new array rather than resizing, so concurrent searches see a consistent matrix
+            self._emb_matrix = np.vstack((self._emb_matrix, embeddings))
+    
+    def _exact_search(self, emb_matrix: np.ndarray, query_embeddings: np.ndarray, k: int):
+        """Top-k inner-product search by matmul, returned in the same shape as index.search"""
+        scores = query_embeddings @ emb_matrix.T
+        n = scores.shape[1]
+        top_k = min(k, n)
+        top = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        
+        # Pad like faiss (-1 ids) when fewer than k vectors exist
+        similarities = np.full((len(query_embeddings), k), -np.inf, dtype=np.float32)
+        indices = np.full((len(query_embeddings), k), -1, dtype=np.int64)
+        similarities[:, :top_k] = np.take_along_axis(top_scores, order, axis=1)
+        indices[:, :top_k] = np.take_along_axis(top, order, axis=1)
+        return similarities, indices
+    
+    def add_document(self, file_path: str, content_hash: Optional[str] = None) -> bool:
+        """Add a document to the diet RAG system"""
+        try:
+            # Process document (safe to run in parallel, no shared state)
+            chunks = self.processor.process_document(file_path)
+            
+            with self._lock:
+                self._add_chunks(file_path, chunks, content_hash=content_hash)
             
             print(f"Added {len(chunks)} chunks from {file_path} to Diet RAG")
             return True
@@ -119,49 +259,89 @@ class DietRAG:
         except Exception as e:
             print(f"Error adding document: {e}")
             return False
+        finally:
+            if content_hash:
+                with self._hash_lock:
+                    self._pending_hashes.discard(content_hash)
+    
+    def search_iter(self, query: str, k: int = 3) -> Iterator[dict]:
+        """Search for relevant documents, yielding hits one at a time"""
+        yield from self.search_batch([query], k)[0]
     
     def search(self, query: str, k: int = 3) -> List[dict]:
         """Search for relevant documents"""
-        if self.index is None or self.index.ntotal == 0:
-            return []
+        return list(self.search_iter(query, k))
+    
+    def search_batch(self, queries: List[str], k: int = 3) -> List[List[dict]]:
+        """Search for several queries at once (one embedding pass, one index search)
+        
+        Queries nearly identical to a recent one reuse its results from the query cache
+        """
+        if not queries or self.index is None or self.index.ntotal == 0:
+            return [[] for _ in queries]
         
         try:
-            # Create query embedding (lazy loads model if needed)
-            query_embedding = self._get_embedding_model().encode(query)
-            query_embedding = np.array([query_embedding], dtype=np.float32)
-            
-            # Search
-            distances, indices = self.index.search(query_embedding, k)
-            
-            # Return results
-            results = []
-            for distance, idx in zip(distances[0], indices[0]):
-                if idx != -1 and idx < len(self.documents):
-                    results.append({
-                        'content': self.documents[idx],
-                        'distance': float(distance),
-                        'relevance_score': float(1 / (1 + distance))  # Convert distance to similarity
-                    })
+            # Embed all uncached queries in a single forward pass (lazy loads model if needed)
+            query_embeddings = embed_queries(queries)
             
-            return results
+            results = self.query_cache.lookup(query_embeddings, k)
+            misses = [i for i, result in enumerate(results) if result is None]
+            if not misses:
+                return results
             
+            # Search only the queries the cache couldn't answer (fancy indexing copies,
+            # so skip it in the common case where nothing was cached)
+            if len(misses) == len(queries):
+                miss_embeddings = query_embeddings
+            else:
+                miss_embeddings = query_embeddings[misses]
+            with self._index_lock:
+                index, emb_matrix = self.index, self._emb_matrix
+                if index is None:
+                    # Cleared while the queries were being embedded
+                    return [[] for _ in queries]
+                if emb_matrix is None:
+                    similarities, indices = index.search(miss_embeddings, k)
+            # The exact-search matrix is replaced, never modified, so it is searched outside the lock
+            if emb_matrix is not None:
+                similarities, indices = self._exact_search(emb_matrix, miss_embeddings, k)
         except Exception as e:
             print(f"Error searching: {e}")
-            return []
+            return [[] for _ in queries]
+        
+        # Fetch the texts of every retrieved id in one query
+        texts = self.store.get_texts(indices[indices != -1])
+        for i, row_similarities, row_indices in zip(misses, similarities, indices):
+            results[i] = [
+                {
+                    'content': texts[idx],
+                    'distance': float(1 - similarity),
+                    'relevance_score': float(similarity)
+                }
+                for similarity, idx in zip(row_similarities, row_indices)
+                if idx in texts
+            ]
+        
+        self.query_cache.store(miss_embeddings, k, [results[i] for i in misses])
+        return results
     
     def clear(self):
         """Clear all documents from the RAG system"""
-        self.index = None
-        self.documents = []
-        if self.index_path.exists():
-            self.index_path.unlink()
-        if self.docs_path.exists():
-            self.docs_path.unlink()
+        with self._lock:
+            with self._index_lock:
+                self.index = None
+                self._emb_matrix = None
+            self._dirty = False
+            self.store.clear_texts()
+            self.query_cache.clear()
+            if self.index_path.exists():
+                self.index_path.unlink()
+            self.content_hashes = set()
         print("Diet RAG cleared")
     
     def get_document_count(self) -> int:
         """Get number of documents in the system"""
-        return len(self.documents) if self.documents else 0
+        return self.index.ntotal if self.index is not None else 0
     
     def process_folder(self, folder_path: str) -> dict:
         """Process all documents in a folder"""
@@ -178,18 +358,35 @@ class DietRAG:
             "files": []
         }
         
-        for file_path in files:
+        # Parse every file in parallel worker processes, then embed in this process
+        parsed = self.processor.process_many([str(file_path) for file_path in files])
+        
+        pending = []
+        for file_path, chunks in zip(files, parsed):
+            if isinstance(chunks, Exception):
+                print(f"Error adding document: {chunks}")
+                results["failed"] += 1
+                results["files"].append({"name": file_path.name, "status": "failed"})
+            else:
+                pending.append((file_path, chunks))
+        
+        # Embed each group of files in one encode() call and one index.add(),
+        # saving a snapshot of the index after every group
+        for start in range(0, len(pending), INDEX_SNAPSHOT_EVERY):
+            batch = pending[start:start + INDEX_SNAPSHOT_EVERY]
             try:
-                success = self.add_document(str(file_path))
-                if success:
-                    results["processed"] += 1
-                    results["files"].append({"name": file_path.name, "status": "success"})
-                else:
-                    results["failed"] += 1
-                    results["files"].append({"name": file_path.name, "status": "failed"})
+                with self._lock:
+                    self._add_file_batch([(str(file_path), chunks) for file_path, chunks in batch])
             except Exception as e:
-                results["failed"] += 1
-                results["files"].append({"name": file_path.name, "status": "error", "error": str(e)})
+                for file_path, _ in batch:
+                    results["failed"] += 1
+                    results["files"].append({"name": file_path.name, "status": "error", "error": str(e)})
+                continue
+            
+            for file_path, chunks in batch:
+                print(f"Added {len(chunks)} chunks from {file_path} to Diet RAG")
+                results["processed"] += 1
+                results["files"].append({"name": file_path.name, "status": "success"})
         
         return results
 
@@ -4,8 +4,12 @@ Handles loading and processing of documents for RAG systems
 """
 
 import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from typing import List, Optional
 from pathlib import Path
+from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import (
     PyPDFLoader,
@@ -13,14 +17,38 @@ from langchain_community.document_loaders import (
     Docx2txtLoader,
 )
 
+# Pages are joined with the splitter's top-level separator so page breaks
+# remain preferred split points
+PAGE_SEPARATOR = "\n\n"
+
+
+@lru_cache(maxsize=8)
+def _get_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    """Shared text splitter per (chunk_size, chunk_overlap)"""
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+    )
+
+
+@lru_cache(maxsize=8)
+def _get_worker_processor(chunk_size: int, chunk_overlap: int) -> "DocumentProcessor":
+    """Processor reused by every file handled in a worker process"""
+    return DocumentProcessor(chunk_size, chunk_overlap)
+
+
+def _process_one(file_path: str, chunk_size: int, chunk_overlap: int) -> List:
+    """Load and split one file in a worker process (module-level so it can be pickled)"""
+    return _get_worker_processor(chunk_size, chunk_overlap).process_document(file_path)
+
+
 class DocumentProcessor:
     """Processes documents for RAG ingestion"""
     
     def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-        )
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.text_splitter = _get_splitter(chunk_size, chunk_overlap)
     
     def load_document(self, file_path: str) -> List:
         """Load a document based on its extension"""
@@ -45,12 +73,70 @@ class DocumentProcessor:
             raise Exception(f"Error loading document: {str(e)}")
     
     def split_documents(self, documents: List) -> List:
-        """Split documents into chunks"""
-        return self.text_splitter.split_documents(documents)
+        """Split documents into chunks
+        
+        All pages are joined and split in a single pass. Chunks keep the
+        metadata of the page they start on
+        """
+        if not documents:
+            return []
+        
+        # Start offset of each page in the joined text
+        page_starts = []
+        offset = 0
+        for doc in documents:
+            page_starts.append(offset)
+            offset += len(doc.page_content) + len(PAGE_SEPARATOR)
+        
+        text = PAGE_SEPARATOR.join(doc.page_content for doc in documents)
+        
+        chunks = []
+        page = 0
+        search_from = 0
+        for chunk_text in self.text_splitter.split_text(text):
+            start = text.find(chunk_text, search_from)
+            if start != -1:
+                search_from = start + 1
+                while page + 1 < len(page_starts) and page_starts[page + 1] <= start:
+                    page += 1
+            chunks.append(Document(page_content=chunk_text, metadata=dict(documents[page].metadata)))
+        return chunks
     
     def process_document(self, file_path: str) -> List:
         """Process a document: load and split"""
         documents = self.load_document(file_path)
         chunks = self.split_documents(documents)
         return chunks
-
+    
+    def process_many(self, file_paths: List[str], max_workers: Optional[int] = None) -> List:
+        """Process several documents in parallel worker processes
+        
+        PDF/DOCX parsing is pure-Python CPU work, so threads can't run it in parallel.
+        
+        Returns:
+            One entry per path, in order: the list of chunks, or the exception
+            raised while processing that file
+        """
+        if len(file_paths) <= 1:
+            results = []
+            for file_path in file_paths:
+                try:
+                    results.append(self.process_document(file_path))
+                except Exception as e:
+                    results.append(e)
+            return results
+        
+        workers = min(max_workers or os.cpu_count() or 1, len(file_paths))
+        # spawn: forking a server process that already runs threads (and torch/FAISS) is unsafe
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = [
+                executor.submit(_process_one, file_path, self.chunk_size, self.chunk_overlap)
+                for file_path in file_paths
+            ]
+            results = []
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    results.append(e)
+        return results
@@ -0,0 +1,119 @@
+"""
+Document Store
+SQLite-backed storage for RAG chunk texts, the processed files list and upload content hashes
+"""
+
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+
+class DocumentStore:
+    """Chunk texts keyed by their FAISS vector id, appended incrementally"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        # One connection shared by request threads, serialized by the lock
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._lock = threading.Lock()
+
+        # A forked worker opens its own connection instead of sharing the parent's
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reconnect_after_fork)
+
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS docs (id INTEGER PRIMARY KEY, text TEXT NOT NULL)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS processed_files (name TEXT PRIMARY KEY)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS content_hashes (hash TEXT PRIMARY KEY)")
+
+    def _reconnect_after_fork(self):
+        """Replace the connection inherited from the parent process"""
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def count(self) -> int:
+        """Number of stored chunks"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def add_texts(self, start_id: int, texts: List[str], content_hashes: Iterable[str] = ()):
+        """Store chunk texts under consecutive ids starting at start_id
+
+        The content hashes of the documents they came from are recorded in the
+        same transaction, so a hash is never stored without its chunks
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO docs (id, text) VALUES (?, ?)",
+                enumerate(texts, start_id)
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO content_hashes (hash) VALUES (?)",
+                ((content_hash,) for content_hash in content_hashes)
+            )
+
+    def get_texts(self, ids: Iterable[int]) -> Dict[int, str]:
+        """Fetch the texts for the given ids (only those rows are read)"""
+        ids = list({int(i) for i in ids})
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, text FROM docs WHERE id IN ({placeholders})", ids
+            ).fetchall()
+        return dict(rows)
+
+    def clear_texts(self):
+        """Delete all chunk texts and the content hashes recorded with them"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM docs")
+            self._conn.execute("DELETE FROM content_hashes")
+
+    def get_processed_files(self) -> List[str]:
+        """Names of files already ingested from the documents folder"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT name FROM processed_files")]
+
+    def add_processed_file(self, name: str):
+        """Record a processed file name"""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO processed_files (name) VALUES (?)", (name,))
+
+    def get_content_hashes(self) -> List[str]:
+        """Content hashes of uploaded documents already ingested"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT hash FROM content_hashes")]
+
+    def import_legacy_files(self, docs_path: Path, processed_files_path: Path, content_hashes_path: Path):
+        """Import documents.txt / processed_files.txt / content_hashes.txt written by
+        older versions, then remove them"""
+        if docs_path.exists():
+            if self.count() == 0:
+                with open(docs_path, 'r', encoding='utf-8') as f:
+                    self.add_texts(0, [line.strip() for line in f.readlines()])
+            docs_path.unlink()
+
+        if processed_files_path.exists():
+            with open(processed_files_path, 'r', encoding='utf-8') as f:
+                names = [line.strip() for line in f if line.strip()]
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO processed_files (name) VALUES (?)",
+                    ((name,) for name in names)
+                )
+            processed_files_path.unlink()
+
+        if content_hashes_path.exists():
+            with open(content_hashes_path, 'r', encoding='utf-8') as f:
+                hashes = [line.strip() for line in f if line.strip()]
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO content_hashes (hash) VALUES (?)",
+                    ((content_hash,) for content_hash in hashes)
+                )
+            content_hashes_path.unlink()
@@ -0,0 +1,94 @@
+"""
+Embedding Model
+Shared sentence-transformers model used by the diet and exercise RAG systems
+"""
+
+import os
+import threading
+from typing import List
+
+# Size the OpenMP/MKL pools before torch is imported (via sentence_transformers);
+# container defaults are often wrong. Explicit environment settings win
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", os.cpu_count() or 4))
+os.environ.setdefault("OMP_NUM_THREADS", str(EMBEDDING_THREADS))
+os.environ.setdefault("MKL_NUM_THREADS", str(EMBEDDING_THREADS))
+
+import numpy as np
+from cachetools import LRUCache
+from sentence_transformers import SentenceTransformer
+
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# "onnx" runs the int8-quantized ONNX export published with the model on ONNX Runtime
+# (2-4x faster on CPU); "torch" uses the regular PyTorch weights
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "onnx").lower()
+# quint8_avx2 runs on any x86-64 server; use onnx/model_qint8_avx512.onnx on AVX-512 hosts
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "onnx/model_quint8_avx2.onnx")
+
+# Lazy-loaded model, shared by both RAG systems (one copy in memory)
+_embedding_model = None
+_embedding_model_lock = threading.Lock()
+
+# Query embeddings keyed by the exact query string, shared by both RAG systems so
+# the same phrasing searched in diet and exercise docs is only embedded once
+_query_embedding_cache = LRUCache(maxsize=4096)
+_query_embedding_lock = threading.Lock()
+
+
+def _configure_torch_threads():
+    """Use every core inside an op and a single inter-op thread (one encode at a time)"""
+    import torch
+    torch.set_num_threads(EMBEDDING_THREADS)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Can only be set before torch runs any parallel work
+        pass
+
+
+def _load_embedding_model() -> SentenceTransformer:
+    """Load the model with the configured backend, falling back to PyTorch"""
+    # Runs once per process (guarded by get_embedding_model)
+    _configure_torch_threads()
+    if EMBEDDING_BACKEND == "onnx":
+        try:
+            return SentenceTransformer(
+                EMBEDDING_MODEL_NAME,
+                backend="onnx",
+                model_kwargs={"file_name": EMBEDDING_ONNX_FILE}
+            )
+        except Exception as e:
+            print(f"Could not load ONNX embedding model, falling back to PyTorch: {e}")
+    return SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+
+def get_embedding_model() -> SentenceTransformer:
+    """Get the shared embedding model, loading it on first use (reduces startup memory)"""
+    global _embedding_model
+    if _embedding_model is None:
+        with _embedding_model_lock:
+            if _embedding_model is None:
+                print("Loading embedding model (this may take a moment on first use)...")
+                _embedding_model = _load_embedding_model()
+                print("Embedding model loaded successfully")
+    return _embedding_model
+
+
+def embed_queries(queries: List[str]) -> np.ndarray:
+    """Normalized float32 embeddings for search queries, reusing cached ones (not for document chunks)"""
+    with _query_embedding_lock:
+        cached = [_query_embedding_cache.get(query) for query in queries]
+    
+    # Embed every uncached query in a single forward pass
+    misses = list(dict.fromkeys(q for q, e in zip(queries, cached) if e is None))
+    if misses:
+        embeddings = get_embedding_model().encode(misses, normalize_embeddings=True)
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        # Cached rows are shared between callers, so make them read-only
+        embeddings.flags.writeable = False
+        fresh = dict(zip(misses, embeddings))
+        with _query_embedding_lock:
+            _query_embedding_cache.update(fresh)
+        cached = [e if e is not None else fresh[q] for q, e in zip(queries, cached)]
+    
+    return np.vstack(cached)
@@ -3,43 +3,28 @@ Exercise Agent
 Responsible for generating workout/exercise recommendations
 """
 
-from typing import Dict
+from typing import AsyncIterator, Dict, List
+from langchain_core.messages import AIMessageChunk
 from langchain_openai import ChatOpenAI
 from langgraph.prebuilt import create_react_agent
-from app.services.agent_tools import search_exercise_rag, search_web_exercise
+from app.services.agent_tools import (
+    search_exercise_rag,
+    search_web_exercise,
+    search_exercise_rag_batch,
+    search_web_exercise_batch,
+)
 from app.services.agent_state import AgentState
 
 
-class ExerciseAgent:
-    """Agent for exercise and workout recommendations"""
-    
-    def __init__(self, llm: ChatOpenAI):
-        self.llm = llm
-        self.tools = [search_exercise_rag, search_web_exercise]
-        self.agent = create_react_agent(llm, self.tools)
-    
-    def generate_recommendation(self, state: Dict) -> str:
-        """
-        Generate exercise recommendation based on body type and goals
-        
-        Args:
-            state: Current agent state
-            
-        Returns:
-            Exercise recommendation string
-        """
-        body_type = state.get('body_type', 'unknown')
-        goals = state.get('goals', 'general fitness')
-        iteration = state.get('current_iteration', 0)
-        
-        # Construct prompt for the agent
-        prompt = f"""You are an expert fitness trainer and exercise physiologist.
+# Static instructions, sent as the system message; kept byte-identical across
+# calls so the constant prefix is served from the provider's prompt cache
+EXERCISE_SYSTEM_PROMPT = """You are an expert fitness trainer and exercise physiologist.
 
-Generate a comprehensive 4-week workout plan for a {body_type} with the following goals: {goals}
+Generate a comprehensive 4-week workout plan for the body type and goals given by the user.
 
 Your plan should include:
 1. Weekly workout structure (4 weeks, 28 days)
-2. Exercise selection tailored to {body_type} body type
+2. Exercise selection tailored to the user's body type
 3. Sets, reps, and rest periods for each exercise
 4. Progressive overload plan
 5. Weekly frequency and split
@@ -48,17 +33,63 @@ Your plan should include:
 8. Recovery and rest day recommendations
 
 Use the search tools available to find relevant information:
+- search_exercise_rag_batch: Search uploaded exercise/workout documents for a list of queries
+- search_web_exercise_batch: Search current web information for a list of queries
 - search_exercise_rag: Search uploaded exercise/workout documents
 - search_web_exercise: Search current web information about exercises/workouts
 
-This is iteration {iteration + 1} of refinement. Provide detailed, actionable workout recommendations.
+Batch your searches: put all the questions you have into one search_exercise_rag_batch
+and one search_web_exercise_batch call per step instead of calling the single-query tools repeatedly.
+
+Provide detailed, actionable workout recommendations.
 Format your response as a comprehensive training program that can be followed for 4 weeks.
 """
+
+
+class ExerciseAgent:
+    """Agent for exercise and workout recommendations"""
+    
+    def __init__(self, llm: ChatOpenAI):
+        self.llm = llm
+        self.tools = [search_exercise_rag_batch, search_web_exercise_batch, search_exercise_rag, search_web_exercise]
+        self.agent = create_react_agent(llm, self.tools)
+    
+    def _build_messages(self, state: Dict) -> List[Dict]:
+        """Build the agent messages from the current state
+        
+        Only the short user message varies; the system prompt is identical on every
+        call, so the provider's prompt prefix cache can reuse it across iterations
+        """
+        body_type = state.get('body_type', 'unknown')
+        goals = state.get('goals', 'general fitness')
+        iteration = state.get('current_iteration', 0)
+        
+        return [
+            {"role": "system", "content": EXERCISE_SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": (
+                    f"Body type: {body_type}\n"
+                    f"Goals: {goals}\n"
+                    f"This is iteration {iteration + 1} of refinement."
+                )
+            }
+        ]
+    
+    def generate_recommendation(self, state: Dict) -> str:
+        """
+        Generate exercise recommendation based on body type and goals
+        
+        Args:
+            state: Current agent state
+            
+        Returns:
+            Exercise recommendation string
+        """
+        messages = self._build_messages(state)
         
         # Call the agent
-        response = self.agent.invoke({
-            "messages": [{"role": "user", "content": prompt}]
-        })
+        response = self.agent.invoke({"messages": messages})
         
         # Extract content from the last message
         if response.get('messages'):
@@ -69,4 +100,25 @@ Format your response as a comprehensive training program that can be followed fo
                 return last_message['content']
         
         return "Exercise recommendation could not be generated."
-
+    
+    async def astream_recommendation(self, state: Dict) -> AsyncIterator[str]:
+        """
+        Stream exercise recommendation text as the LLM generates it
+        
+        Args:
+            state: Current agent state
+            
+        Yields:
+            Text deltas of the agent's answer (tool calls are not yielded)
+        """
+        messages = self._build_messages(state)
+        
+        async for chunk, metadata in self.agent.astream(
+            {"messages": messages},
+            stream_mode="messages"
+        ):
+            # Only forward tokens produced by the LLM node, not tool outputs
+            if metadata.get("langgraph_node") != "agent":
+                continue
+            if isinstance(chunk, AIMessageChunk) and isinstance(chunk.content, str) and chunk.content:
+                yield chunk.content
@@ -4,16 +4,118 @@ Generates a single, punchy, and impactful motivational sentence
 that bridges training intensity and nutritional discipline.
 """
 
-from typing import Optional
+import logging
+import random
+import threading
+from datetime import date
+from typing import Dict, List, Optional, Tuple
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage
 
+logger = logging.getLogger(__name__)
+
+VALID_TONES = frozenset({"Stoic", "Energetic", "Scientific", "Empathetic"})
+DAYS_OF_WEEK = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+# Sentences kept per (tone, day_of_week) bucket: requests pick one at random and
+# buckets below the target are topped up by a background thread
+SENTENCES_PER_BUCKET = 10
+
+# LLM calls allowed per refill (replies can come back empty, so filling isn't guaranteed)
+MAX_REFILL_ATTEMPTS = SENTENCES_PER_BUCKET * 2
+
+# Returned when the LLM gives no usable sentence for an empty bucket
+FALLBACK_SENTENCE = "Train like an athlete, eat like a scientist."
+
 
 class MotivationalAgent:
     """Agent for generating motivational sentences"""
     
     def __init__(self, llm: ChatOpenAI):
         self.llm = llm
+        # (tone, day_of_week or "") -> generated sentences
+        self._cache: Dict[Tuple[str, str], List[str]] = {}
+        self._refilling = set()
+        self._cache_lock = threading.Lock()
+    
+    def get_motivational_sentence(
+        self,
+        tone: str = "Energetic",
+        day_of_week: Optional[str] = None
+    ) -> str:
+        """
+        Get a motivational sentence from the pre-generated pool
+        
+        Only calls the LLM inline when the (tone, day_of_week) bucket is still empty.
+        Days outside Monday-Sunday aren't pooled and are generated directly.
+        """
+        if tone not in VALID_TONES:
+            tone = "Energetic"
+        day = day_of_week.strip().capitalize() if day_of_week else ""
+        if day and day not in DAYS_OF_WEEK:
+            return self.generate_motivational_sentence(tone, day_of_week) or FALLBACK_SENTENCE
+        
+        key = (tone, day)
+        with self._cache_lock:
+            bucket = self._cache.get(key)
+            sentence = random.choice(bucket) if bucket else None
+        
+        if sentence is None:
+            # Retry an empty reply once before falling back to a fixed sentence
+            sentence = (
+                self.generate_motivational_sentence(tone, day or None)
+                or self.generate_motivational_sentence(tone, day or None)
+            )
+            if sentence:
+                self._add_sentence(key, sentence)
+            else:
+                sentence = FALLBACK_SENTENCE
+        
+        self._schedule_refill(key)
+        return sentence
+    
+    def prefill(self):
+        """Start filling today's buckets (and the no-day buckets) for every tone in the background"""
+        today = DAYS_OF_WEEK[date.today().weekday()]
+        for tone in VALID_TONES:
+            for day in ("", today):
+                self._schedule_refill((tone, day))
+    
+    def _add_sentence(self, key: Tuple[str, str], sentence: str):
+        """Add a sentence to its bucket (bounded by SENTENCES_PER_BUCKET)"""
+        if not sentence:
+            return
+        with self._cache_lock:
+            bucket = self._cache.setdefault(key, [])
+            if len(bucket) < SENTENCES_PER_BUCKET:
+                bucket.append(sentence)
+    
+    def _schedule_refill(self, key: Tuple[str, str]):
+        """Top up a bucket in a background thread unless it is full or already being filled"""
+        with self._cache_lock:
+            if len(self._cache.get(key, ())) >= SENTENCES_PER_BUCKET or key in self._refilling:
+                return
+            self._refilling.add(key)
+        threading.Thread(target=self._refill, args=(key,), daemon=True).start()
+    
+    def _refill(self, key: Tuple[str, str]):
+        """Generate sentences until the bucket is full (at most MAX_REFILL_ATTEMPTS LLM calls)"""
+        tone, day = key
+        try:
+            for _ in range(MAX_REFILL_ATTEMPTS):
+                if len(self._cache.get(key, ())) >= SENTENCES_PER_BUCKET:
+                    break
+                sentence = self.generate_motivational_sentence(tone, day or None)
+                if not sentence:
+                    # An empty reply is likely to repeat; leave the rest to the next refill
+                    logger.warning("⚠️ Empty motivational sentence for %s, stopping refill", key)
+                    break
+                self._add_sentence(key, sentence)
+        except Exception:
+            logger.exception("❌ Error refilling motivational sentences")
+        finally:
+            with self._cache_lock:
+                self._refilling.discard(key)
     
     def generate_motivational_sentence(
         self, 
@@ -31,8 +133,7 @@ class MotivationalAgent:
             Single sentence string (max 100 characters)
         """
         # Validate tone
-        valid_tones = ["Stoic", "Energetic", "Scientific", "Empathetic"]
-        if tone not in valid_tones:
+        if tone not in VALID_TONES:
             tone = "Energetic"  # Default
         
         # Build context for day of week if provided
@@ -59,8 +160,8 @@ EXAMPLES:
 
 IMPORTANT: Return ONLY the sentence string - no quotes, no explanation, no additional text."""
 
-        # Call the LLM
-        response = self.llm.invoke([HumanMessage(content=prompt)])
+        # Call the LLM (stop at the first line break: only one sentence is wanted)
+        response = self.llm.invoke([HumanMessage(content=prompt)], stop=["\n"])
         
         # Extract content
         sentence = ""
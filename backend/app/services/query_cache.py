@@ -0,0 +1,72 @@
+"""
+Semantic Query Cache
+Reuses RAG search results for queries whose embeddings are nearly identical
+"""
+
+import threading
+import time
+from typing import List, Optional
+import faiss
+import numpy as np
+
+
+class SemanticQueryCache:
+    """LRU cache of recent query embeddings and their search results"""
+
+    def __init__(self, dimension: int, max_entries: int = 10000, threshold: float = 0.97):
+        self.dimension = dimension
+        self.max_entries = max_entries
+        # Cosine similarity (embeddings are unit-normalized) needed to count as a hit
+        self.threshold = threshold
+        self._index = faiss.IndexFlatIP(dimension)
+        self._entries = []  # (k, results), aligned with the vectors in self._index
+        self._last_used = []
+        self._lock = threading.Lock()
+
+    def lookup(self, embeddings: np.ndarray, k: int) -> List[Optional[List[dict]]]:
+        """Return cached results per query embedding, or None where there is no close match"""
+        with self._lock:
+            if self._index.ntotal == 0:
+                return [None] * len(embeddings)
+
+            scores, ids = self._index.search(embeddings, 1)
+            now = time.monotonic()
+            results = []
+            for score, idx in zip(scores[:, 0], ids[:, 0]):
+                if idx != -1 and score >= self.threshold:
+                    cached_k, cached_results = self._entries[idx]
+                    # Results cached for a larger k also answer smaller ones
+                    if cached_k >= k:
+                        self._last_used[idx] = now
+                        results.append(cached_results[:k])
+                        continue
+                results.append(None)
+            return results
+
+    def store(self, embeddings: np.ndarray, k: int, results: List[List[dict]]):
+        """Cache results for the given query embeddings, evicting least recently used entries"""
+        with self._lock:
+            overflow = self._index.ntotal + len(embeddings) - self.max_entries
+            if overflow > 0:
+                self._evict(overflow)
+
+            self._index.add(embeddings)
+            now = time.monotonic()
+            self._entries.extend((k, r) for r in results)
+            self._last_used.extend([now] * len(results))
+
+    def _evict(self, count: int):
+        """Drop the count least recently used entries (caller must hold self._lock)"""
+        evicted = np.argsort(self._last_used)[:count]
+        self._index.remove_ids(evicted.astype(np.int64))
+        # remove_ids compacts the index, so compact the parallel lists the same way
+        evicted_set = set(evicted.tolist())
+        self._entries = [e for i, e in enumerate(self._entries) if i not in evicted_set]
+        self._last_used = [t for i, t in enumerate(self._last_used) if i not in evicted_set]
+
+    def clear(self):
+        """Forget all cached queries (call whenever the searched documents change)"""
+        with self._lock:
+            self._index.reset()
+            self._entries = []
+            self._last_used = []
@@ -4,9 +4,11 @@ Automatically processes documents from folder uploads
 """
 
 from pathlib import Path
-from typing import List
+from typing import Iterable, List
 import os
 
+SUPPORTED_EXTENSIONS = frozenset({'.pdf', '.docx', '.txt', '.md'})
+
 
 class RAGFolderLoader:
     """Load and process documents from folders"""
@@ -14,24 +16,27 @@ class RAGFolderLoader:
     def __init__(self, folder_path: str):
         self.folder_path = Path(folder_path)
         self.folder_path.mkdir(parents=True, exist_ok=True)
-        self.supported_extensions = {'.pdf', '.docx', '.txt', '.md'}
+        self.supported_extensions = SUPPORTED_EXTENSIONS
     
     def get_files(self) -> List[Path]:
         """Get all supported files in the folder"""
-        files = []
         if not self.folder_path.exists():
-            return files
-        
-        for file_path in self.folder_path.iterdir():
-            if file_path.is_file() and file_path.suffix.lower() in self.supported_extensions:
-                files.append(file_path)
+            return []
         
-        return files
+        # scandir's DirEntry.is_file() uses the file type from the directory
+        # listing, so only symlinks need an extra stat()
+        with os.scandir(self.folder_path) as entries:
+            return [
+                Path(entry.path)
+                for entry in entries
+                if entry.is_file()
+                and os.path.splitext(entry.name)[1].lower() in self.supported_extensions
+            ]
     
-    def get_unprocessed_files(self, processed_files: List[str]) -> List[Path]:
-        """Get files that haven't been processed yet"""
+    def get_unprocessed_files(self, processed_files: Iterable[str]) -> List[Path]:
+        """Get files that haven't been processed yet (processed_files may be a list or a set)"""
         all_files = self.get_files()
-        processed_set = set(processed_files)
+        processed_set = processed_files if isinstance(processed_files, (set, frozenset)) else set(processed_files)
         
         return [f for f in all_files if f.name not in processed_set]
     
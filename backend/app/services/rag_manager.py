@@ -3,19 +3,27 @@ RAG Manager - Centralized lazy loading for RAG systems
 This prevents circular import issues
 """
 
+import threading
 from app.services.diet_rag import DietRAG
 from app.services.exercise_rag import ExerciseRAG
+from app.services.embedding_model import EMBEDDING_BACKEND
 
 # Lazy-loaded RAG instances
 _diet_rag = None
 _exercise_rag = None
 
+# FastAPI runs these sync getters (used as Depends) in the threadpool,
+# so guard against two first requests building separate instances
+_rag_lock = threading.Lock()
+
 
 def get_diet_rag():
     """Get or create DietRAG instance (lazy loading)"""
     global _diet_rag
     if _diet_rag is None:
-        _diet_rag = DietRAG()
+        with _rag_lock:
+            if _diet_rag is None:
+                _diet_rag = DietRAG()
     return _diet_rag
 
 
@@ -23,6 +31,26 @@ def get_exercise_rag():
     """Get or create ExerciseRAG instance (lazy loading)"""
     global _exercise_rag
     if _exercise_rag is None:
-        _exercise_rag = ExerciseRAG()
+        with _rag_lock:
+            if _exercise_rag is None:
+                _exercise_rag = ExerciseRAG()
     return _exercise_rag
 
+
+
+def warm_up_rag_systems():
+    """Load both RAG indexes and their embedding models (run in a background thread)"""
+    for rag in (get_diet_rag(), get_exercise_rag()):
+        rag._get_embedding_model()
+
+
+def preload_rag_systems():
+    """Load the RAG indexes (and the PyTorch embedding model) in a pre-fork master process
+    
+    Forked workers share these pages copy-on-write instead of each loading a copy.
+    ONNX Runtime sessions don't survive fork (their thread pools stay in the parent),
+    so with the ONNX backend each worker still loads its own (small, quantized) model
+    """
+    rags = (get_diet_rag(), get_exercise_rag())
+    if EMBEDDING_BACKEND == "torch":
+        rags[0]._get_embedding_model()
@@ -3,15 +3,23 @@ Web Search Tool for Agents
 Uses DuckDuckGo to search the web for current information
 """
 
+import threading
 from typing import List, Dict
+from cachetools import TTLCache
 from duckduckgo_search import DDGS
 
+# Identical searches within this window reuse the earlier results
+SEARCH_CACHE_TTL_SECONDS = 300
+
 
 class WebSearchTool:
     """Web search tool for agents to get current information"""
     
     def __init__(self):
+        # One DDGS client for the process, so its HTTP session is reused across searches
         self.ddgs = DDGS()
+        self._cache = TTLCache(maxsize=512, ttl=SEARCH_CACHE_TTL_SECONDS)
+        self._cache_lock = threading.Lock()
     
     def search(self, query: str, max_results: int = 5) -> List[Dict]:
         """
@@ -24,6 +32,12 @@ class WebSearchTool:
         Returns:
             List of search results with title, url, and snippet
         """
+        key = (query.lower().strip(), max_results)
+        with self._cache_lock:
+            cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        
         try:
             results = []
             search_results = self.ddgs.text(
@@ -40,6 +54,10 @@ class WebSearchTool:
                     'snippet': result.get('body', '')
                 })
             
+            # Failed searches come back empty; don't pin them for the whole TTL
+            if results:
+                with self._cache_lock:
+                    self._cache[key] = results
             return results
             
         except Exception as e:
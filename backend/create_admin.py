@@ -18,11 +18,8 @@ def main():
     init_database()
     
     # Check if admin exists
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) as count FROM admin_users")
-    admin_count = cursor.fetchone()['count']
-    conn.close()
+    with get_db_connection() as conn:
+        admin_count = conn.execute("SELECT COUNT(*) as count FROM admin_users").fetchone()['count']
     
     if admin_count > 0:
         print(f"\n⚠️  {admin_count} admin account(s) already exist(s).")
@@ -12,6 +12,15 @@ load_dotenv()
 ADMIN_CLERK_USER_ID = os.getenv("ADMIN_CLERK_USER_ID", "")
 CLERK_SECRET_KEY = os.getenv("CLERK_SECRET_KEY", "")
 
+# One keep-alive HTTP/2 client for all Clerk API calls, so repeated lookups
+# reuse the TCP/TLS connection (same settings as the app's shared client)
+_CLERK_CLIENT = httpx.Client(
+    base_url="https://api.clerk.com/v1",
+    http2=True,
+    timeout=10.0,
+    headers={"Content-Type": "application/json"}
+)
+
 def get_clerk_user_info(user_id: str, secret_key: str):
     """Get user information from Clerk API"""
     if not secret_key or secret_key == "sk_test_xxxxx":
@@ -20,21 +29,17 @@ def get_clerk_user_info(user_id: str, secret_key: str):
         return None
     
     try:
-        url = f"https://api.clerk.com/v1/users/{user_id}"
-        headers = {
-            "Authorization": f"Bearer {secret_key}",
-            "Content-Type": "application/json"
-        }
+        response = _CLERK_CLIENT.get(
+            f"/users/{user_id}",
+            headers={"Authorization": f"Bearer {secret_key}"}
+        )
         
-        with httpx.Client() as client:
-            response = client.get(url, headers=headers, timeout=10.0)
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                print(f"❌ Error fetching user: {response.status_code}")
-                print(f"   Response: {response.text}")
-                return None
+        if response.status_code == 200:
+            return response.json()
+        else:
+            print(f"❌ Error fetching user: {response.status_code}")
+            print(f"   Response: {response.text}")
+            return None
     except Exception as e:
         print(f"❌ Error: {str(e)}")
         return None
@@ -0,0 +1,32 @@
+"""
+Shared test fixtures
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    """Point the shared connection pool at an empty database file for one test
+
+    Yields the database path; nothing is created until the test connects
+    (so a test can lay down an older schema before calling init_database)
+    """
+    pytest.importorskip("cachetools")
+    # database.py creates data/ relative to the working directory on first import
+    monkeypatch.chdir(tmp_path)
+    from app import database
+
+    db_path = tmp_path / "fitness.db"
+    database.db_pool.close_all()
+    monkeypatch.setattr(database.db_pool, "db_path", db_path)
+    with database._user_exists_lock:
+        database._user_exists_cache.clear()
+    yield db_path
+    database.db_pool.close_all()
@@ -0,0 +1,63 @@
+"""
+Regression tests for the admin authentication endpoints
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("fastapi")
+from fastapi.testclient import TestClient
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    """App with only the admin-auth router, backed by a throwaway database"""
+    # database.py resolves data/fitness.db against the working directory at import time
+    workdir = tmp_path_factory.mktemp("admin_auth")
+    previous_cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        from fastapi import FastAPI
+        from app.database import init_database
+        from app.api.v1 import admin_auth as admin_auth_router
+        from app.services.admin_auth import create_admin_user
+
+        init_database()
+        assert create_admin_user("admin", "correct-horse")
+
+        app = FastAPI()
+        app.include_router(admin_auth_router.router)
+        yield TestClient(app)
+    finally:
+        os.chdir(previous_cwd)
+
+
+def _login(client) -> str:
+    response = client.post("/admin-auth/login", json={"username": "admin", "password": "correct-horse"})
+    assert response.status_code == 200
+    return response.json()["access_token"]
+
+
+def test_me_with_real_token(client):
+    token = _login(client)
+    response = client.get("/admin-auth/me", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json()["admin"]["username"] == "admin"
+
+
+def test_verify_with_real_token(client):
+    token = _login(client)
+    response = client.get("/admin-auth/verify", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json() == {"valid": True, "username": "admin"}
+
+
+def test_me_rejects_invalid_token(client):
+    response = client.get("/admin-auth/me", headers={"Authorization": "Bearer not-a-token"})
+    assert response.status_code == 401
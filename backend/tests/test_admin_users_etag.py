@@ -0,0 +1,56 @@
+"""
+Tests for conditional GETs (ETag / If-None-Match) on the admin user endpoints
+"""
+
+import pytest
+
+pytest.importorskip("fastapi")
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def client(fresh_db):
+    """Admin router on an empty database, with admin auth stubbed out"""
+    from app import database
+    from app.api.v1 import admin as admin_router
+
+    database.init_database()
+    database.save_user_classification_and_plans("user_a", "Mesomorph", "male", "w1", "m1")
+
+    app = FastAPI()
+    app.include_router(admin_router.router, prefix="/api/v1/admin")
+    app.dependency_overrides[admin_router.verify_admin] = lambda: {"type": "jwt", "username": "admin"}
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.mark.parametrize("path", ["/api/v1/admin/users", "/api/v1/admin/users/user_a"])
+def test_unchanged_data_returns_304(client, path):
+    first = client.get(path)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"')
+
+    second = client.get(path, headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.headers["etag"] == etag
+    assert second.content == b""
+
+
+def test_strong_form_of_the_tag_also_matches(client):
+    etag = client.get("/api/v1/admin/users").headers["etag"]
+    response = client.get("/api/v1/admin/users", headers={"If-None-Match": etag[2:]})
+    assert response.status_code == 304
+
+
+def test_changed_data_returns_200_with_a_new_etag(client):
+    from app import database
+
+    etag = client.get("/api/v1/admin/users").headers["etag"]
+    database.save_user_classification_and_plans("user_b", "Ectomorph", "female", "w2", "m2")
+
+    response = client.get("/api/v1/admin/users", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["count"] == 2
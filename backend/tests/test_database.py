@@ -0,0 +1,127 @@
+"""
+Tests for the schema migrations and UPSERT writes in app.database
+"""
+
+import sqlite3
+
+import pytest
+
+# Schema written by the first release, before any of the migrations in init_database
+BASELINE_SCHEMA = """
+    CREATE TABLE users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        clerk_user_id TEXT UNIQUE NOT NULL,
+        email TEXT,
+        name TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE classifications (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        body_type TEXT NOT NULL,
+        gender TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    );
+    CREATE TABLE fitness_plans (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        classification_id INTEGER NOT NULL,
+        workout_plan TEXT,
+        meal_plan TEXT,
+        plan_version INTEGER DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        FOREIGN KEY (classification_id) REFERENCES classifications(id)
+    );
+    CREATE TABLE admin_users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password_hash TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_login TIMESTAMP
+    );
+
+    -- One user with two classifications and three plans (duplicates the
+    -- unique-index migration has to resolve)
+    INSERT INTO users (clerk_user_id, email) VALUES ('user_a', 'a@example.com');
+    INSERT INTO classifications (user_id, body_type, gender, created_at)
+        VALUES (1, 'Ectomorph', 'male', '2024-01-01'), (1, 'Mesomorph', 'male', '2024-02-01');
+    INSERT INTO fitness_plans (user_id, classification_id, workout_plan, meal_plan, created_at)
+        VALUES (1, 1, 'w1', 'm1', '2024-01-01'),
+               (1, 2, 'w2', 'm2', '2024-02-01'),
+               (1, 2, 'w3', 'm3', '2024-02-02');
+"""
+
+
+@pytest.fixture
+def baseline_db(fresh_db):
+    """Database in the baseline schema, migrated by init_database"""
+    conn = sqlite3.connect(fresh_db)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.close()
+
+    from app import database
+    database.init_database()
+    return fresh_db
+
+
+def _rows(db_path, sql):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def test_migration_keeps_latest_rows_and_archives_the_rest(baseline_db):
+    assert _rows(baseline_db, "SELECT id, body_type FROM classifications") == [(2, "Mesomorph")]
+    assert _rows(baseline_db, "SELECT id FROM fitness_plans") == [(3,)]
+    assert _rows(baseline_db, "SELECT id FROM classifications_archive") == [(1,)]
+    assert sorted(_rows(baseline_db, "SELECT id FROM fitness_plans_archive")) == [(1,), (2,)]
+
+
+def test_migration_moves_plan_text_and_backfills_clerk_id(baseline_db):
+    columns = {row[1] for row in _rows(baseline_db, "PRAGMA table_info(fitness_plans)")}
+    assert "workout_plan" not in columns and "meal_plan" not in columns
+
+    from app import database
+    plan = database.get_user_latest_plan("user_a")
+    assert plan["workout_plan"] == "w3"
+    assert plan["meal_plan"] == "m3"
+    assert plan["body_type"] == "Mesomorph"
+
+
+def test_migration_adds_cascading_foreign_keys(baseline_db):
+    for table in ("classifications", "fitness_plans"):
+        foreign_keys = _rows(baseline_db, f"PRAGMA foreign_key_list({table})")
+        assert foreign_keys and all(fk[6] == "CASCADE" for fk in foreign_keys)
+
+    from app import database
+    assert database.delete_user_from_db("user_a")
+    assert _rows(baseline_db, "SELECT COUNT(*) FROM classifications") == [(0,)]
+    assert _rows(baseline_db, "SELECT COUNT(*) FROM fitness_plans") == [(0,)]
+    # Only the live plan's text cascades; text of archived plans is kept with the archive
+    assert _rows(baseline_db, "SELECT plan_id FROM fitness_plan_bodies ORDER BY plan_id") == [(1,), (2,)]
+
+
+def test_init_database_is_idempotent(baseline_db):
+    from app import database
+    database.init_database()
+    assert _rows(baseline_db, "SELECT COUNT(*) FROM classifications") == [(1,)]
+    assert _rows(baseline_db, "SELECT COUNT(*) FROM fitness_plans_archive") == [(2,)]
+
+
+def test_saving_again_updates_the_users_rows_in_place(fresh_db):
+    from app import database
+    database.init_database()
+
+    first = database.save_user_classification_and_plans("user_b", "Ectomorph", "female", "w1", "m1")
+    second = database.save_user_classification_and_plans("user_b", "Endomorph", "female", "w2", "m2")
+
+    # Same user, classification and plan ids: the UPSERTs update instead of inserting
+    assert first == second
+    assert _rows(fresh_db, "SELECT COUNT(*) FROM classifications") == [(1,)]
+    assert _rows(fresh_db, "SELECT COUNT(*) FROM fitness_plans") == [(1,)]
+    plan = database.get_user_latest_plan("user_b")
+    assert (plan["body_type"], plan["workout_plan"], plan["meal_plan"]) == ("Endomorph", "w2", "m2")
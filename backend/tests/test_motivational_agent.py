@@ -0,0 +1,65 @@
+"""
+Tests for the motivational sentence pool
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("langchain_openai")
+from app.services.motivational_agent import (
+    FALLBACK_SENTENCE,
+    MAX_REFILL_ATTEMPTS,
+    SENTENCES_PER_BUCKET,
+    MotivationalAgent,
+)
+
+KEY = ("Stoic", "")
+
+
+class ScriptedLLM:
+    """Chat model stand-in that returns a fixed reply and counts calls"""
+
+    def __init__(self, reply: str):
+        self.reply = reply
+        self.calls = 0
+
+    def invoke(self, messages, stop=None):
+        self.calls += 1
+        return SimpleNamespace(content=self.reply)
+
+
+def test_refill_fills_the_bucket():
+    llm = ScriptedLLM("Lift heavy, eat clean.")
+    agent = MotivationalAgent(llm)
+    agent._refill(KEY)
+    assert len(agent._cache[KEY]) == SENTENCES_PER_BUCKET
+    assert llm.calls == SENTENCES_PER_BUCKET
+
+
+def test_refill_stops_on_an_empty_reply():
+    # e.g. a reply starting with a newline is cut to "" by stop=["\n"]
+    llm = ScriptedLLM("\n")
+    agent = MotivationalAgent(llm)
+    agent._refill(KEY)
+    assert llm.calls == 1
+    assert not agent._cache.get(KEY)
+    assert KEY not in agent._refilling
+
+
+def test_refill_is_bounded_when_the_bucket_never_fills(monkeypatch):
+    llm = ScriptedLLM("Lift heavy, eat clean.")
+    agent = MotivationalAgent(llm)
+    monkeypatch.setattr(agent, "_add_sentence", lambda key, sentence: None)
+    agent._refill(KEY)
+    assert llm.calls == MAX_REFILL_ATTEMPTS
+
+
+def test_cold_bucket_falls_back_instead_of_returning_empty(monkeypatch):
+    llm = ScriptedLLM("")
+    agent = MotivationalAgent(llm)
+    monkeypatch.setattr(agent, "_schedule_refill", lambda key: None)
+    assert agent.get_motivational_sentence("Stoic") == FALLBACK_SENTENCE
+    # One retry, and nothing empty was pooled
+    assert llm.calls == 2
+    assert not agent._cache.get(KEY)
@@ -0,0 +1,65 @@
+"""
+Tests for the upload size limit middleware
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("multipart")
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.api.v1.upload_limits import UploadSizeLimitMiddleware
+
+LIMIT = 1024
+
+
+@pytest.fixture(scope="module")
+def client():
+    """App with one limited upload route that records whether it ran"""
+    app = FastAPI()
+    app.state.calls = 0
+    app.add_middleware(UploadSizeLimitMiddleware, limits={"/upload": LIMIT})
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        app.state.calls += 1
+        return {"size": len(await file.read())}
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def test_small_upload_passes(client):
+    response = client.post("/upload", files={"file": ("a.txt", b"x" * 100)})
+    assert response.status_code == 200
+    assert response.json() == {"size": 100}
+
+
+def test_oversized_content_length_rejected_before_route(client):
+    calls = client.app.state.calls
+    response = client.post("/upload", files={"file": ("a.txt", b"x" * (LIMIT * 4))})
+    assert response.status_code == 413
+    assert client.app.state.calls == calls
+
+
+def test_oversized_chunked_upload_rejected_before_route(client):
+    calls = client.app.state.calls
+
+    def body():
+        for _ in range(8):
+            yield b"x" * LIMIT
+
+    response = client.post(
+        "/upload",
+        content=body(),
+        headers={"Content-Type": "multipart/form-data; boundary=b"}
+    )
+    assert response.status_code == 413
+    assert client.app.state.calls == calls
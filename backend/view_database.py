@@ -4,40 +4,156 @@ Database Viewer Script
 View and explore your fitness database data
 """
 
-import sqlite3
+import atexit
+import sys
+import time
 from pathlib import Path
 from datetime import datetime
 
 DB_PATH = Path("data/fitness.db")
 
+# Indexes behind the "latest classification/plan" lookups and the plan counts
+# (same names as init_database creates, so a database set up by the app is untouched)
+VIEWER_INDEXES = {
+    "idx_class_user_created": "CREATE INDEX IF NOT EXISTS idx_class_user_created ON classifications(user_id, created_at DESC)",
+    "idx_plans_class_created": "CREATE INDEX IF NOT EXISTS idx_plans_class_created ON fitness_plans(classification_id, created_at DESC)",
+    "idx_plans_user": "CREATE INDEX IF NOT EXISTS idx_plans_user ON fitness_plans(user_id)",
+}
 
-def get_connection():
-    """Get database connection"""
-    conn = sqlite3.connect(DB_PATH)
+# Tables print_table may show (names are interpolated into SQL, so only these are allowed)
+VIEWABLE_TABLES = frozenset({"users", "classifications", "fitness_plans", "fitness_plan_bodies", "admin_users"})
+
+# Users shown per page by the users command
+USERS_PAGE_SIZE = 200
+
+# Row layout of the users summary, bound once instead of re-evaluating an f-string per row
+# (positional: id, email, name, body type, gender, has plan, user created)
+USER_ROW_FORMAT = "{0:<5} | {1:<30} | {2:<20} | {3:<12} | {4:<8} | {5:<10} | {6}".format
+
+# Longer text values are shown as their first 47 characters plus "..."
+MAX_CELL_CHARS = 50
+# Column names and truncating select list per table (built from PRAGMA table_info
+# once; the schema is fixed per run)
+_table_select_lists = {}
+
+# Statistics queries, grouped by the tables they read; the groups are independent,
+# so each runs on its own read-only connection in parallel (rows are tagged with
+# their metric; body_type/gender rows carry a label)
+STATS_QUERIES = (
+    """
+        SELECT 'users' as metric, NULL as label, COUNT(*) as count FROM users
+        UNION ALL
+        SELECT 'users_with_plans', NULL, COUNT(*) FROM users u
+        WHERE EXISTS (SELECT 1 FROM fitness_plans p WHERE p.user_id = u.id)
+    """,
+    "SELECT 'plans' as metric, NULL as label, COUNT(*) as count FROM fitness_plans",
+    """
+        SELECT 'classifications' as metric, NULL as label, COUNT(*) as count FROM classifications
+        UNION ALL
+        SELECT * FROM (
+            SELECT 'body_type', body_type, COUNT(*) FROM classifications GROUP BY body_type
+        )
+        UNION ALL
+        SELECT * FROM (
+            SELECT 'gender', gender, COUNT(*) FROM classifications
+            WHERE gender IS NOT NULL
+            GROUP BY gender
+        )
+    """,
+)
+
+# Computed statistics, reused for a few seconds when several views run in one process
+STATS_TTL_SECONDS = 5
+_stats_cache = {"value": None, "ts": 0.0}
+
+# One connection for the whole run, so SQLite's page cache survives across views
+_conn = None
+
+
+def ensure_indexes(conn):
+    """Create the viewer's indexes (databases from older app versions may lack them)
+    
+    The viewer's own connection is read-only, so missing indexes are created
+    through a short-lived read-write connection (normally never opened)
+    """
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    missing = [sql for name, sql in VIEWER_INDEXES.items() if name not in existing]
+    if not missing:
+        return
+    
+    import sqlite3
+    writer = sqlite3.connect(DB_PATH)
+    try:
+        with writer:
+            for sql in missing:
+                writer.execute(sql)
+    finally:
+        writer.close()
+
+
+def _open_read_only():
+    """Open a read-only connection with the viewer's settings"""
+    # Imported here so printing the menu doesn't pay for loading sqlite3
+    import sqlite3
+    
+    # The viewer never writes, so open read-only: no write locks, and it can't
+    # contend with the app writing at the same time.
+    # Statements are compiled once and reused from this cache, as long as
+    # queries keep stable SQL text (values are always bound as parameters)
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True, cached_statements=256)
     conn.row_factory = sqlite3.Row
+    # journal_mode/synchronous are write-side settings (the app already uses WAL)
+    conn.executescript("""
+        PRAGMA temp_store=MEMORY;
+        PRAGMA cache_size=-64000;
+        PRAGMA mmap_size=268435456;
+    """)
     return conn
 
 
-def print_table(table_name, limit=10):
-    """Print table contents"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # Get column names
-    cursor.execute(f"PRAGMA table_info({table_name})")
-    columns = [row[1] for row in cursor.fetchall()]
-    
-    # Get data
-    cursor.execute(f"SELECT * FROM {table_name} LIMIT {limit}")
-    rows = cursor.fetchall()
-    
+def get_connection():
+    """Get the shared read-only database connection, opening it on first use"""
+    global _conn
+    if _conn is None:
+        _conn = _open_read_only()
+        ensure_indexes(_conn)
+        atexit.register(_conn.close)
+    return _conn
+
+
+def write_lines(lines):
+    """Write many output lines with a single write instead of one print() per line"""
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
+
+
+def _table_select_list(conn, table_name):
+    """Columns of a table and a select list that truncates long text values inside SQLite
+    
+    Only the shortened text crosses into Python, not e.g. whole plan bodies
+    """
+    cached = _table_select_lists.get(table_name)
+    if cached is None:
+        columns = [row['name'] for row in conn.execute(f"PRAGMA table_info({table_name})")]
+        # typeof() keeps this to text values, whatever the declared column type
+        select_list = ", ".join(
+            f"CASE WHEN typeof(\"{col}\") = 'text' AND length(\"{col}\") > {MAX_CELL_CHARS} "
+            f"THEN substr(\"{col}\", 1, {MAX_CELL_CHARS - 3}) || '...' ELSE \"{col}\" END AS \"{col}\""
+            for col in columns
+        )
+        cached = (columns, select_list)
+        _table_select_lists[table_name] = cached
+    return cached
+
+
+def _print_table_rows(table_name, columns, rows):
+    """Print one table section (long text was already truncated in the query)"""
     print(f"\n{'='*80}")
     print(f"Table: {table_name} ({len(rows)} rows shown)")
     print(f"{'='*80}")
     
     if not rows:
         print("No data found")
-        conn.close()
         return
     
     # Print header
@@ -46,50 +162,86 @@ def print_table(table_name, limit=10):
     print("-" * len(header))
     
     # Print rows
-    for row in rows:
-        values = []
-        for col in columns:
-            val = row[col]
-            if isinstance(val, str) and len(val) > 50:
-                val = val[:47] + "..."
-            values.append(str(val) if val is not None else "NULL")
-        print(" | ".join(values))
+    write_lines([
+        " | ".join(str(val) if val is not None else "NULL" for val in row)
+        for row in rows
+    ])
+
+
+def print_table(table_name, limit=10):
+    """Print table contents"""
+    print_tables([table_name], limit)
+
+
+def print_tables(table_names, limit=10):
+    """Print the first rows of several tables, fetched with a single query"""
+    for table_name in table_names:
+        if table_name not in VIEWABLE_TABLES:
+            print(f"Unknown table: {table_name}")
+    table_names = [name for name in table_names if name in VIEWABLE_TABLES]
+    if not table_names:
+        return
     
-    conn.close()
+    conn = get_connection()
+    select_lists = [_table_select_list(conn, name) for name in table_names]
+    
+    # One UNION ALL over all tables: each part is tagged with its table's position
+    # and padded with NULLs to the widest table (bound LIMITs keep the SQL text stable)
+    width = max(len(columns) for columns, _ in select_lists)
+    parts = [
+        f"SELECT * FROM (SELECT {i} AS _t, {select_list}{', NULL' * (width - len(columns))} "
+        f"FROM {name} LIMIT ?)"
+        for i, (name, (columns, select_list)) in enumerate(zip(table_names, select_lists))
+    ]
+    rows_by_table = [[] for _ in table_names]
+    for row in conn.execute(" UNION ALL ".join(parts), (limit,) * len(parts)):
+        t = row[0]
+        rows_by_table[t].append(tuple(row)[1:1 + len(select_lists[t][0])])
+    
+    for name, (columns, _), rows in zip(table_names, select_lists, rows_by_table):
+        _print_table_rows(name, columns, rows)
 
 
-def view_all_users():
-    """View all users with their classifications and plans"""
+def view_all_users(limit=USERS_PAGE_SIZE, offset=0):
+    """View users (newest first, one page at a time) with their classifications and plans"""
     conn = get_connection()
     cursor = conn.cursor()
     
+    # Rank classifications per user once, instead of running a correlated subquery
+    # for every user row; has_plan only needs existence, so plans aren't joined.
+    # The page of users is cut first, walking the rowid b-tree newest-first
+    # (ids are assigned in creation order), so SQLite stops after limit rows
     cursor.execute("""
+        WITH latest_classification AS (
+            SELECT 
+                id,
+                user_id,
+                body_type,
+                gender,
+                created_at,
+                ROW_NUMBER() OVER (
+                    PARTITION BY user_id ORDER BY created_at DESC, id DESC
+                ) AS rn
+            FROM classifications
+        )
         SELECT 
             u.id,
-            u.clerk_user_id,
-            u.email,
-            u.name,
-            u.created_at as user_created,
-            c.body_type,
-            c.gender,
-            c.created_at as classification_date,
-            CASE WHEN f.id IS NOT NULL THEN 'Yes' ELSE 'No' END as has_plan,
-            f.created_at as plan_date
-        FROM users u
-        LEFT JOIN classifications c ON u.id = c.user_id AND c.id = (
-            SELECT id FROM classifications 
-            WHERE user_id = u.id 
-            ORDER BY created_at DESC 
-            LIMIT 1
-        )
-        LEFT JOIN fitness_plans f ON c.id = f.classification_id AND f.id = (
-            SELECT id FROM fitness_plans 
-            WHERE classification_id = c.id 
-            ORDER BY created_at DESC 
-            LIMIT 1
-        )
-        ORDER BY u.created_at DESC
-    """)
+            COALESCE(NULLIF(u.email, ''), 'N/A') as email,
+            COALESCE(NULLIF(u.name, ''), 'N/A') as name,
+            COALESCE(NULLIF(c.body_type, ''), 'N/A') as body_type,
+            COALESCE(NULLIF(c.gender, ''), 'N/A') as gender,
+            CASE WHEN EXISTS (
+                SELECT 1 FROM fitness_plans f WHERE f.classification_id = c.id
+            ) THEN 'Yes' ELSE 'No' END as has_plan,
+            u.created_at as user_created
+        FROM (
+            SELECT id, email, name, created_at FROM users
+            ORDER BY id DESC
+            LIMIT ? OFFSET ?
+        ) u
+        LEFT JOIN latest_classification c ON c.user_id = u.id AND c.rn = 1
+        ORDER BY u.id DESC
+    """, (limit, offset))
     
     rows = cursor.fetchall()
     
@@ -99,19 +251,19 @@ def view_all_users():
     
     if not rows:
         print("No users found")
-        conn.close()
         return
     
     # Print header
-    print(f"{'ID':<5} | {'Email':<30} | {'Name':<20} | {'Body Type':<12} | {'Gender':<8} | {'Has Plan':<10} | {'User Created'}")
+    print(USER_ROW_FORMAT("ID", "Email", "Name", "Body Type", "Gender", "Has Plan", "User Created"))
     print("-" * 100)
     
-    for row in rows:
-        print(f"{row['id']:<5} | {str(row['email'] or 'N/A'):<30} | {str(row['name'] or 'N/A'):<20} | "
-              f"{str(row['body_type'] or 'N/A'):<12} | {str(row['gender'] or 'N/A'):<8} | "
-              f"{row['has_plan']:<10} | {row['user_created']}")
+    # The query selects exactly the displayed columns in order (NULLs already
+    # replaced with 'N/A'), so rows unpack positionally without name lookups
+    write_lines([USER_ROW_FORMAT(*row) for row in rows])
     
-    conn.close()
+    if len(rows) == limit:
+        print(f"\nShowing users {offset + 1}-{offset + limit}; next page: "
+              f"python view_database.py users {limit} {offset + limit}")
 
 
 def view_user_details(user_id=None, clerk_user_id=None):
@@ -125,14 +277,12 @@ def view_user_details(user_id=None, clerk_user_id=None):
         cursor.execute("SELECT * FROM users WHERE clerk_user_id = ?", (clerk_user_id,))
     else:
         print("Please provide either user_id or clerk_user_id")
-        conn.close()
         return
     
     user = cursor.fetchone()
     
     if not user:
         print("User not found")
-        conn.close()
         return
     
     print(f"\n{'='*80}")
@@ -146,101 +296,116 @@ def view_user_details(user_id=None, clerk_user_id=None):
     
     # Get classifications
     cursor.execute("""
-        SELECT * FROM classifications 
+        SELECT body_type, gender, created_at FROM classifications 
         WHERE user_id = ? 
         ORDER BY created_at DESC
     """, (user['id'],))
     
-    classifications = cursor.fetchall()
-    print(f"\nClassifications ({len(classifications)}):")
-    for cls in classifications:
-        print(f"  - {cls['body_type']} ({cls['gender']}) - {cls['created_at']}")
+    # Stream rows straight off the cursor instead of materializing every Row first;
+    # only the formatted lines are kept (the header needs the count)
+    lines = [
+        f"  - {body_type} ({gender}) - {created_at}"
+        for body_type, gender, created_at in cursor
+    ]
+    print(f"\nClassifications ({len(lines)}):")
+    write_lines(lines)
     
-    # Get plans
+    # Get plans (plan sizes are measured in SQL, so the plan texts never leave SQLite)
     cursor.execute("""
-        SELECT f.*, c.body_type, c.gender 
+        SELECT 
+            f.id,
+            f.created_at,
+            c.body_type,
+            COALESCE(length(b.workout_plan), 0) as workout_len,
+            COALESCE(length(b.meal_plan), 0) as meal_len
         FROM fitness_plans f
         JOIN classifications c ON f.classification_id = c.id
+        LEFT JOIN fitness_plan_bodies b ON b.plan_id = f.id
         WHERE f.user_id = ?
         ORDER BY f.created_at DESC
     """, (user['id'],))
     
-    plans = cursor.fetchall()
-    print(f"\nFitness Plans ({len(plans)}):")
-    for plan in plans:
-        workout_len = len(plan['workout_plan'] or '')
-        meal_len = len(plan['meal_plan'] or '')
-        print(f"  - Plan ID: {plan['id']} | Body Type: {plan['body_type']} | "
-              f"Workout: {workout_len} chars | Meal: {meal_len} chars | Created: {plan['created_at']}")
+    lines = [
+        f"  - Plan ID: {plan_id} | Body Type: {body_type} | "
+        f"Workout: {workout_len} chars | Meal: {meal_len} chars | Created: {created_at}"
+        for plan_id, created_at, body_type, workout_len, meal_len in cursor
+    ]
+    print(f"\nFitness Plans ({len(lines)}):")
+    write_lines(lines)
+
+
+def _run_read_only(sql):
+    """Run one query on a short-lived read-only connection (safe to call from worker threads)"""
+    conn = _open_read_only()
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def _compute_stats():
+    """Count users, classifications and plans, plus the body type and gender distributions"""
+    now = time.monotonic()
+    if _stats_cache["value"] is not None and now - _stats_cache["ts"] < STATS_TTL_SECONDS:
+        return _stats_cache["value"]
+    
+    # Imported here, like sqlite3, to keep the bare menu cheap
+    from concurrent.futures import ThreadPoolExecutor
+    
+    # Make sure the indexes exist before the workers query
+    get_connection()
+    
+    # sqlite3 releases the GIL while stepping, so the groups' scans overlap
+    with ThreadPoolExecutor(max_workers=len(STATS_QUERIES)) as executor:
+        results = list(executor.map(_run_read_only, STATS_QUERIES))
+    
+    stats = {"body_type": [], "gender": []}
+    for metric, label, count in (row for rows in results for row in rows):
+        if metric in ("body_type", "gender"):
+            stats[metric].append((label, count))
+        else:
+            stats[metric] = count
     
-    conn.close()
+    _stats_cache["value"] = stats
+    _stats_cache["ts"] = now
+    return stats
 
 
 def view_statistics():
     """View database statistics"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
     print(f"\n{'='*80}")
     print("DATABASE STATISTICS")
     print(f"{'='*80}")
     
-    # Count users
-    cursor.execute("SELECT COUNT(*) as count FROM users")
-    user_count = cursor.fetchone()['count']
-    print(f"Total Users: {user_count}")
-    
-    # Count classifications
-    cursor.execute("SELECT COUNT(*) as count FROM classifications")
-    class_count = cursor.fetchone()['count']
-    print(f"Total Classifications: {class_count}")
+    stats = _compute_stats()
+    print(f"Total Users: {stats['users']}")
+    print(f"Total Classifications: {stats['classifications']}")
+    print(f"Total Fitness Plans: {stats['plans']}")
     
-    # Count plans
-    cursor.execute("SELECT COUNT(*) as count FROM fitness_plans")
-    plan_count = cursor.fetchone()['count']
-    print(f"Total Fitness Plans: {plan_count}")
-    
-    # Body type distribution
-    cursor.execute("""
-        SELECT body_type, COUNT(*) as count 
-        FROM classifications 
-        GROUP BY body_type
-    """)
     print(f"\nBody Type Distribution:")
-    for row in cursor.fetchall():
-        print(f"  {row['body_type']}: {row['count']}")
+    for body_type, count in stats["body_type"]:
+        print(f"  {body_type}: {count}")
     
-    # Gender distribution
-    cursor.execute("""
-        SELECT gender, COUNT(*) as count 
-        FROM classifications 
-        WHERE gender IS NOT NULL
-        GROUP BY gender
-    """)
     print(f"\nGender Distribution:")
-    for row in cursor.fetchall():
-        print(f"  {row['gender']}: {row['count']}")
-    
-    # Users with plans
-    cursor.execute("""
-        SELECT COUNT(DISTINCT user_id) as count 
-        FROM fitness_plans
-    """)
-    users_with_plans = cursor.fetchone()['count']
-    print(f"\nUsers with Plans: {users_with_plans} / {user_count}")
+    for gender, count in stats["gender"]:
+        print(f"  {gender}: {count}")
     
-    conn.close()
+    print(f"\nUsers with Plans: {stats['users_with_plans']} / {stats['users']}")
 
 
 def main():
     """Main menu"""
-    import sys
-    
     if len(sys.argv) > 1:
         command = sys.argv[1]
         
         if command == "users":
-            view_all_users()
+            try:
+                limit = int(sys.argv[2]) if len(sys.argv) > 2 else USERS_PAGE_SIZE
+                offset = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+            except ValueError:
+                print("Usage: python view_database.py users [limit] [offset]")
+                return
+            view_all_users(limit, offset)
         elif command == "stats":
             view_statistics()
         elif command == "user":
@@ -253,10 +418,7 @@ def main():
             else:
                 print("Usage: python view_database.py user <user_id or clerk_user_id>")
         elif command == "tables":
-            print_table("users")
-            print_table("classifications")
-            print_table("fitness_plans")
-            print_table("admin_users")
+            print_tables(["users", "classifications", "fitness_plans", "admin_users"])
         else:
             print(f"Unknown command: {command}")
     else:
@@ -266,7 +428,7 @@ def main():
         print("="*80)
         print("\nAvailable commands:")
         print("  python view_database.py stats          - Show database statistics")
-        print("  python view_database.py users          - View all users summary")
+        print("  python view_database.py users [n] [o]  - View users summary (n per page from offset o)")
         print("  python view_database.py user <id>      - View specific user details")
         print("  python view_database.py tables         - View all tables")
         print("\nOr use SQLite directly:")
@@ -275,9 +437,7 @@ def main():
         print("  SELECT * FROM users;")
         print("  SELECT * FROM classifications;")
         print("  SELECT * FROM fitness_plans;")
-        
-        # Show stats by default
-        view_statistics()
+        # The bare menu doesn't touch the database; use the stats command for statistics
         print("\n" + "="*80)
 
 
@@ -14,8 +14,8 @@ interface User {
   body_type: string | null;
   gender: string | null;
   classification_date: string | null;
-  workout_plan: string | null;
-  meal_plan: string | null;
+  plan_id: number | null;
+  has_plan: number;
   plan_date: string | null;
 }
 
@@ -340,7 +340,7 @@ export default function AdminDashboard() {
           <div className="bg-white/10 backdrop-blur-xl rounded-2xl p-6 border border-white/20">
             <div className="text-3xl mb-2">💪</div>
             <div className="text-2xl font-bold text-white">
-              {users.filter(u => u.workout_plan).length}
+              {users.filter(u => u.has_plan).length}
             </div>
             <div className="text-gray-400 text-sm">With Plans</div>
           </div>
@@ -199,6 +199,10 @@ export default function DietPage() {
               if (data.event === "status") {
                 console.log("ℹ️ Status:", data.message);
                 setStatus(data.message);
+              } else if (data.event === "diet_delta") {
+                // Render tokens as they stream in
+                mealContent += data.content;
+                setPlan(mealContent);
               } else if (data.event === "diet_complete") {
                 console.log("✅ Meal plan received");
                 mealContent = data.content;
@@ -199,6 +199,10 @@ export default function WorkoutPage() {
               if (data.event === "status") {
                 console.log("ℹ️ Status:", data.message);
                 setStatus(data.message);
+              } else if (data.event === "workout_delta") {
+                // Render tokens as they stream in
+                workoutContent += data.content;
+                setPlan(workoutContent);
               } else if (data.event === "workout_complete") {
                 console.log("✅ Workout plan received");
                 workoutContent = data.content;